@@ -1,186 +1,256 @@
 import ipywidgets as w
-from ipywidgets import Layout, Box
+from ipywidgets import Layout
 import bqplot as bq
+from bqplot.interacts import BrushSelector, BrushIntervalSelector, LassoSelector
 import numpy as np
+from downsample import density_indices
+from grid_index import GridIndex, Selection
+from timing import timer
 
-#debugging output to widget                                 
-out = w.Output(layout={'border': '1px solid black'})
-    
-    
-class Lightcurve_plot():
-    '''plot utility for lightcurves'''
-    
-    
-    def __init__(self, filters = ['G', 'R', 'I'], filter_button_colors = ['green','red','magenta']):
-        '''Initialize plot widget'''
-
-        #define filters
-        self.filters = filters
-        self.filter_button_colors = filter_button_colors
-        self.n_filters = len(self.filters)
-
-        #initialize data
-        self.x = []
-        self.data = []
-        self.err = []
-        self.diffImage = []
-        self.tempImage = []
-        self.sciImage = []
-
-        #define scales for axes 
+
+class Scatter_plot():
+    '''plot utility for large scatter plots (e.g. fit period vs ALCDEF period)'''
+
+
+    def __init__(self, x, y, xlabel='Fit period', ylabel='ALCDEF period', color='dodgerblue',
+                 max_points=5000, n_bins=30, mode='auto', heatmap_bins=100, show=True):
+        '''Initialize plot widget.
+
+        mode is 'auto', 'points' or 'density'. In 'auto' mode a 2-D histogram of
+        heatmap_bins x heatmap_bins cells is shown while the visible window holds
+        more than max_points points, and the individual points below that.
+        In 'points' mode at most about max_points points are sent for the window,
+        keeping up to max_points/n_bins**2 points in each cell of an n_bins x n_bins
+        grid so sparse regions and outliers stay visible. Zooming in with the mouse
+        resamples the window'''
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        self.max_points = max_points
+        self.n_bins = n_bins
+        self.mode = mode
+        self.heatmap_bins = heatmap_bins
+        #grid of the rows used to resolve windows and selections
+        self.index = GridIndex(self.x, self.y)
+        #indices of the points sent to the scatter mark, None while the heatmap is shown
+        self.shown = None
+        #Selection of the rows picked with the brush, interval or lasso
+        self.selection = Selection.from_rows(self.index, [])
+        #set while the kernel pushes the highlighted points to the scatter mark
+        self.highlighting = False
+        self.selection_callbacks = []
+        #window of the last update, min and max of one scale change together but notify separately
+        self.shown_window = None
+
+        #define scales for axes
         self.sc_x = bq.LinearScale()
-        self.sc_y = bq.LinearScale(reverse=True)
-       
-        #initial widgets
-        self.filter_togglebuttons()
-        self.initialize_widget()
-        
-        
+        self.sc_y = bq.LinearScale()
+        self.sc_color = bq.ColorScale(scheme='viridis')
+
+        self.scatter = self.plot_scatter(color)
+        self.heatmap = self.plot_heatmap()
+        self.initialize_widget(xlabel, ylabel)
+        self.update()
+        self.sc_x.observe(self.domain_change, ['min', 'max'])
+        self.sc_y.observe(self.domain_change, ['min', 'max'])
+
         #plot initial widget
-        self.plot()
-        
-    def set_title (self, name):
-        '''Set object name'''
-
-        #Set Label background color https://github.com/jupyter-widgets/ipywidgets/issues/577                                                                      
-        if (hasattr(self, 'title') == False):
-            data_input_style = "<style>.data_input  { background-color:#a3a6b8 !important; }</style>"
-            self.title = w.Label(value=' ObjectId: {}'.format(name),)
-            self.title.add_class('data_input')
-            
-            self.title_items = [
-            w.HTML(data_input_style),
-            self.title
-            ]
-        else:
-            self.title.value = ' ObjectId: {}'.format(name)
+        if (show == True):
+            self.plot()
+
+    @classmethod
+    def from_table(cls, table, x='fit_period', y='period', **kwargs):
+        '''Plot two columns of a DataFrame, e.g. the periods of compute_periods merged with a catalog.
+        Rows of the table are rows of the plot, so it pairs with a Selection_table of the same table'''
+        return cls(table[x].values, table[y].values, xlabel=x, ylabel=y, **kwargs)
 
- 
-    def plot_scatter(self, x=[], y=[], color='red', filt=''):
+    def plot_scatter(self, color='dodgerblue'):
         '''Create and return Scatter plot'''
-        #TODO: tooltip format with all data                                                                                        
         tooltip = bq.Tooltip(fields=['x', 'y'], formats=['.2f', '.2f'])
-        scatt = bq.Scatter(
+        return bq.Scatter(
                 default_size=3,
                 scales={'x': self.sc_x, 'y': self.sc_y},
+                colors=[color],
                 tooltip=tooltip,
                 tooltip_style={'opacity': 0.5},
                 interactions={'hover': 'tooltip'},
                 unhovered_style={'opacity': 0.5},
-                display_legend=True)
-        scatt.colors = [color]
-        scatt.label = filt
-        if ((y != [])):
-            scatt.x = x
-            scatt.y = y
-        scatt.on_element_click(self.plot_images)
-        
-        return scatt
-
-    def plot_errorbar(self, x=[], y=[], err_y = [],  color='red'):
-        '''Create and return errorbars using OHLC format'''
-        vals = [[yval-dy,yval+dy,yval-dy,yval+dy] for yval,dy in zip(y,err_y)]
-        #print(vals[0], y[0])                                                                                                      
-        ohlc = bq.OHLC(x=x, y=vals, marker='bar', scales={'x': self.sc_x, 'y': self.sc_y}, 
-                            format='ohlc', opacities=[0.3 for i in x] )
-        ohlc.color=[color]
-        return ohlc
-    
-    def lightcurve_widget(self):
-        '''Create light curve widget'''
-        xax = bq.Axis(label='Time (MJD)', scale=self.sc_x,
-                        grid_lines='solid',
-                        label_location="middle")
-        xax.tick_style={'stroke': 'black', 'font-size': 12}
-
-        yax = bq.Axis(label='Magnitude', scale=self.sc_y,
-                        orientation='vertical', tick_format='0.1f',
-                        grid_lines='solid', label_location="middle")
-        yax.tick_style={'stroke': 'black', 'font-size': 12}
-
-        panzoom = bq.PanZoom(scales={'x': [self.sc_x], 'y': [self.sc_y]})
-        return bq.Figure(axes=[xax, yax], marks=[],
-                        layout=Layout(width='100%', height='auto'),
-                        fig_margin = {'top': 0, 'bottom': 40, 'left': 50, 'right': 0},
-                         legend_location='top-right',
-                         )
-
-    @out.capture()
-    def print_event(self, target):
-        print(target)
-
-    def initialize_widget(self):
+                selected_style={'opacity': 1.0, 'fill': 'DarkOrange', 'stroke': 'Red'},
+                unselected_style={'opacity': 0.5})
+
+    def plot_heatmap(self):
+        '''Create and return the density HeatMap, empty cells are not drawn'''
+        return bq.HeatMap(x=np.arange(2.), y=np.arange(2.), color=np.full((2, 2), np.nan), null_color='white',
+                          scales={'x': self.sc_x, 'y': self.sc_y, 'color': self.sc_color})
+
+    def window(self):
+        '''Return the visible (xmin, xmax, ymin, ymax), None where the scale is automatic'''
+        return self.sc_x.min, self.sc_x.max, self.sc_y.min, self.sc_y.max
+
+    def update(self):
+        '''Show the visible window as a heatmap or as points'''
+        self.shown_window = self.window()
+        with timer.stage('scatter_update') as stage:
+            count = self.index.count_rectangle(*self.window())
+            stage.count = count
+            if (self.mode == 'density' or (self.mode == 'auto' and count > self.max_points)):
+                self.show_heatmap(self.index.rectangle(*self.window()))
+            elif (count > self.max_points):
+                xmin, xmax, ymin, ymax = self.window()
+                per_bin = max(1, self.max_points // self.n_bins**2)
+                self.show_points(density_indices(self.x, self.y, self.n_bins, per_bin, xmin, xmax, ymin, ymax))
+            else:
+                self.show_points(self.index.rectangle(*self.window()))
+
+    def show_points(self, rows):
+        '''Push the given rows to the scatter mark'''
+        self.shown = rows
+        #the selected points are pushed from the kernel, not picked with the lasso
+        self.highlighting = True
+        try:
+            with self.scatter.hold_sync():
+                self.scatter.x = self.x[rows]
+                self.scatter.y = self.y[rows]
+                self.scatter.selected = self.shown_selection()
+        finally:
+            self.highlighting = False
+        if (self.figure.marks != [self.scatter]):
+            self.figure.marks = [self.scatter]
+
+    def show_heatmap(self, rows):
+        '''Push the log10 counts of a 2-D histogram of the window to the heatmap'''
+        xmin, xmax, ymin, ymax = self.window()
+        if (len(rows) > 0):
+            xmin = self.x[rows].min() if xmin is None else xmin
+            xmax = self.x[rows].max() if xmax is None else xmax
+            ymin = self.y[rows].min() if ymin is None else ymin
+            ymax = self.y[rows].max() if ymax is None else ymax
+        else:
+            xmin, xmax, ymin, ymax = self.index.bounds
+        counts, xedges, yedges = np.histogram2d(self.x[rows], self.y[rows], bins=self.heatmap_bins,
+                                                range=[[xmin, xmax], [ymin, ymax]])
+        with np.errstate(divide='ignore'):
+            color = np.where(counts.T > 0, np.log10(counts.T), np.nan).astype(np.float32)
+        self.shown = None
+        with self.heatmap.hold_sync():
+            self.heatmap.x = 0.5 * (xedges[1:] + xedges[:-1])
+            self.heatmap.y = 0.5 * (yedges[1:] + yedges[:-1])
+            self.heatmap.color = color
+        if (self.figure.marks != [self.heatmap]):
+            self.figure.marks = [self.heatmap]
+
+    def domain_change(self, change):
+        '''Resample the points for the new window. A frontend message sets min and max of a
+        scale before either is notified, so the second notification finds the window shown'''
+        if (self.window() != self.shown_window):
+            self.update()
+
+    def set_window(self, xmin=None, xmax=None, ymin=None, ymax=None):
+        '''Show the window (xmin, xmax, ymin, ymax) with a single resample, None for an automatic limit'''
+        with self.sc_x.hold_trait_notifications(), self.sc_y.hold_trait_notifications():
+            self.sc_x.min, self.sc_x.max = xmin, xmax
+            self.sc_y.min, self.sc_y.max = ymin, ymax
+
+    def shown_selection(self):
+        '''Return the positions of the selected rows among the points sent to the scatter mark'''
+        if (self.shown is None or len(self.shown) == 0 or len(self.selection) == 0):
+            return None
+        return np.flatnonzero(self.selection.contains(self.shown)).astype(np.int32)
+
+    @property
+    def selected(self):
+        '''Sorted array of the selected rows'''
+        return self.selection.rows()
+
+    def brush_change(self, change):
+        '''Resolve the brushed rectangle with the grid index once brushing ends'''
+        if (self.brush.brushing == True):
+            return
+        if (self.brush.selected_x is None or len(self.brush.selected_x) < 2):
+            self.select_rows([])
+        else:
+            xmin, xmax = sorted(self.brush.selected_x)
+            ymin, ymax = sorted(self.brush.selected_y)
+            self.select(Selection(self.index, 'rectangle', (xmin, xmax, ymin, ymax)))
+
+    def interval_change(self, change):
+        '''Resolve the brushed x interval with the sorted x index once brushing ends'''
+        if (self.interval.brushing == True):
+            return
+        if (self.interval.selected is None or len(self.interval.selected) < 2):
+            self.select_rows([])
+        else:
+            xmin, xmax = sorted(self.interval.selected)
+            self.select(Selection(self.index, 'interval', (xmin, xmax)))
+
+    def lasso_change(self, change):
+        '''Map the points picked by the lasso in the browser to rows.
+        The browser only sees the points that were sent, so while the window is
+        decimated the lasso selects among those; select_polygon resolves exactly'''
+        if (self.figure.interaction is not self.lasso or self.shown is None or self.highlighting):
+            return
+        positions = [] if change.new is None else np.asarray(change.new, dtype=np.intp)
+        self.select_rows(self.shown[positions])
+
+    def select_rectangle(self, xmin=None, xmax=None, ymin=None, ymax=None):
+        '''Select the rows inside a rectangle, None bounds are open'''
+        self.select(Selection(self.index, 'rectangle', (xmin, xmax, ymin, ymax)))
+
+    def select_polygon(self, vertices):
+        '''Select the rows inside the polygon with the given (x, y) vertices'''
+        self.select(Selection(self.index, 'polygon', np.asarray(vertices, dtype=np.float64)))
+
+    def select_rows(self, rows):
+        '''Select an explicit array of rows'''
+        self.select(Selection.from_rows(self.index, rows))
+
+    def select(self, selection):
+        '''Set the Selection and notify the selection callbacks.
+        Only the selected points that are shown are listed here, callbacks get the
+        Selection and can read len(selection) before paging through its rows'''
+        self.selection = selection
+        self.highlighting = True
+        try:
+            self.scatter.selected = self.shown_selection()
+        finally:
+            self.highlighting = False
+        for callback in self.selection_callbacks:
+            callback(selection)
+
+    def on_select(self, callback):
+        '''Call callback with the Selection whenever the selection changes'''
+        self.selection_callbacks.append(callback)
+
+    def interaction_change(self, change):
+        '''Switch between pan/zoom and the selectors'''
+        self.figure.interaction = self.interactions[change.new]
+
+    def initialize_widget(self, xlabel, ylabel):
         '''Setup layout of the widget'''
-       
-        #define span and size of widgets
-        title_layout = Layout(
-            display='flex',
-            flex_flow='column',
-            justify_content='flex-end',
-            width='100%',
-            height='70',)
- 
-        fullspan_layout = Layout(
-            display='flex',
-            flex_flow='row',
-            align_items='stretch',
-            justify_content='center',
-            width='100%',
-            height='70',
-        )
-        eighty_span_layout = Layout(
-            display='flex',
-            flex_flow='row',
-            justify_content='flex-start',
-            width='80%',
-            height='280px',
-        )
-        twenty_span_layout = Layout(
-            display='flex',
-            flex_flow='column',
-            justify_content='center',
-            width='20%',
-            height='280px',
-        )
-
-        #create widgets using layout
-        self.set_title('')           
-        self.title_box = w.Box(children=self.title_items, layout=title_layout)
-        self.scatter_box = Box(children=[self.lightcurve], layout=eighty_span_layout) 
-        self.image_box = Box(children=[], layout=twenty_span_layout)   
-        
-        #self.fold_radiobutton()
-        self.plot_box = w.HBox([self.scatter_box,self.image_box])
-        #position widgets using widget size
-        self.widget = w.VBox([self.title_box, self.filter_box,self.plot_box], layout=w.Layout(height='350px'))
+        xax = bq.Axis(label=xlabel, scale=self.sc_x, tick_format='0.1f',
+                      grid_lines='solid', label_location="middle")
+        yax = bq.Axis(label=ylabel, scale=self.sc_y, orientation='vertical', tick_format='0.1f',
+                      grid_lines='solid', label_location="middle")
+
+        #the brush has no marks, the selection is resolved in the kernel
+        self.brush = BrushSelector(x_scale=self.sc_x, y_scale=self.sc_y, marks=[])
+        self.brush.observe(self.brush_change, 'brushing')
+        self.interval = BrushIntervalSelector(scale=self.sc_x, marks=[])
+        self.interval.observe(self.interval_change, 'brushing')
+        #the lasso polygon is not sent to the kernel, only the points it picked
+        self.lasso = LassoSelector(marks=[self.scatter])
+        self.scatter.observe(self.lasso_change, 'selected')
+        self.interactions = {'Pan/Zoom': bq.PanZoom(scales={'x': [self.sc_x], 'y': [self.sc_y]}),
+                             'Brush': self.brush,
+                             'Interval': self.interval,
+                             'Lasso': self.lasso}
+        self.interaction_buttons = w.ToggleButtons(options=list(self.interactions.keys()))
+        self.interaction_buttons.observe(self.interaction_change, 'value')
+
+        self.figure = bq.Figure(axes=[xax, yax], marks=[], interaction=self.interactions['Pan/Zoom'],
+                                layout=Layout(width='500px', height='500px'),
+                                fig_margin = {'top': 10, 'bottom': 40, 'left': 50, 'right': 10})
+        self.widget = w.VBox([self.interaction_buttons, self.figure])
 
     def plot(self):
         '''plot display'''
         display(self.widget)
-
-    def loadZTF(self, ztf, initial_filt='R'):
-        '''Plot a ZTF object'''
-        self.set_title(ztf.objectId) 
-        
-
-        #partition data by filter
-        for filt in ztf.filterDict.keys():
-            index = getattr(ztf, filt)
-            self.x.append(ztf.time.loc[index].values)
-            self.data.append(ztf.magpsf.loc[index].values)
-            self.err.append(ztf.sigmapsf.loc[index].values)
-            if (len(ztf.scienceImageArray) != 0):
-                imageList = [ztf.scienceImageArray[i] for i in index.values]
-                self.sciImage.append(imageList)
-                imageList = [ztf.diffImageArray[i] for i in index.values]
-                self.diffImage.append(imageList)
-                imageList = [ztf.templateImageArray[i] for i in index.values]
-                self.tempImage.append(imageList)
-        
-        self.x = np.asarray(self.x)
-        self.data = np.asarray(self.data)
-        self.err = np.asarray(self.err)
-        
-        #define which data set to plot
-        i =  self.filters.index(initial_filt)
-        self.filter_items[i].value = True
@@ -1,140 +1,304 @@
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import threading
 import ipywidgets as w
 import pandas as pd
 #from couchbase.cluster import Cluster, PasswordAuthenticator
 #from couchbase.n1ql import N1QLQuery
-import gzip
-import io
-import os
-import base64
-from astropy.io import fits
-from PIL import Image
 import numpy as np
-
-# use hbase to encode byte strings from kafka as base64 endoded strings
-def encodeImage(buffer):
-    '''Encode a byte array as base64 string'''
-    return base64.b64encode(buffer).decode('ascii')
-    
-def decodeImage(string):
-    '''Decode a string array into byte array using base64'''
-    return base64.b64decode(string)
+from timing import timer
+import ztf_data
+#defined here before the data layer was split out, re-exported so existing imports keep working
+from ztf_data import encodeImage, decodeImage, equalize
 
 def blank_image():
-    output = io.BytesIO()
     image_layout=w.Layout(object_fit='cover', width="40%")
-    
-    im = 10.*np.random.rand(15,15)
-    im = Image.fromarray(im)
-    im = im.convert('RGB')
-    #save as btye array and read into widget
-    im.save(output, format='PNG')
-    return w.Image(value=output.getvalue(),format='png',layout=image_layout)
-
-import operator
-from functools import reduce
-
-def equalize(im):
-    h = im.convert("L").histogram()
-    lut = []
-    for b in range(0, len(h), 256):
-        # step size
-        step = reduce(operator.add, h[b:b+256]) / 255
-        # create equalization lookup table
-        n = 0
-        for i in range(256):
-            lut.append(n / step)
-            n = n + h[i+b]
-    # map image through lookup table
-    return im.point(lut*3)
-
-
-def create_widget(result):
+    return w.Image(value=ztf_data.blank_png(),format='png',layout=image_layout)
+
+def create_widget(result, mode='equalize'):
     '''Generate image widget from couchbase return'''
-    diffImage = decodeImage(result['differenceImage'])
-    sciImage = decodeImage(result['scienceImage'])
-    templateImage = decodeImage(result['templateImage'])
-
-    #read as fits file from byte array 
-    outputArray = []
-    imageArray = [diffImage, sciImage, templateImage]
-    
-    
     image_layout=w.Layout(object_fit='cover', width="40%")
-    for image in imageArray:
-        with gzip.open(io.BytesIO(image), 'rb') as f:
-            with fits.open(io.BytesIO(f.read())) as hdul:
-                output = io.BytesIO()
-                #convert to image (RGB)
-                data = np.uint8(255 * (hdul[0].data - hdul[0].data.min()) / (hdul[0].data.max() - hdul[0].data.min()))
-                im = Image.fromarray(hdul[0].data)
-                im = im.convert('RGB')
-                im = equalize(im)
-                #save as bye array and read into widget
-                im.save(output, format='PNG')
-        outputArray.append(w.Image(value=output.getvalue(),format='png',layout=image_layout))
-    return outputArray
+    return [w.Image(value=png,format='png',layout=image_layout)
+            for png in ztf_data.create_png(result, mode=mode)]
+
+class CutoutStore():
+    '''Fetch and decode the cutouts of alerts on demand through a PNGCache.
+    With workers > 1 fetch_all decodes in the shared process pool of that many processes'''
+    def __init__(self, bucket, neighbours=2, threads=1, cache=None, mode='equalize', workers=1):
+        self.bucket = bucket
+        self.neighbours = neighbours
+        self.mode = mode
+        self.workers = workers
+        self.cache = ztf_data.png_cache if cache is None else cache
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.widgets = {}
+
+    def load(self, candid):
+        '''Return difference, science and template PNG bytes for candid'''
+        key = '{}'.format(candid)
+        with self.lock:
+            future = self.pending.get(key)
+        if (future is not None):
+            return future.result()
+        return self.fetch(key)
+
+    def fetch(self, key):
+        '''Get and decode the cutouts for key - if no image present use a blank image'''
+        pngs = ztf_data.fetch_png(self.bucket, [key], cache=self.cache, mode=self.mode)[0]
+        if (pngs is None):
+            pngs = [ztf_data.blank_png()]*len(ztf_data.STAMP_KEYS)
+        with self.lock:
+            self.pending.pop(key, None)
+        return pngs
+
+    def prefetch(self, candids):
+        '''Fetch and decode the cutouts for candids in the background'''
+        for candid in candids:
+            key = '{}'.format(candid)
+            with self.lock:
+                if (self.cache.has_stamps(key, mode=self.mode) or key in self.pending):
+                    continue
+                self.pending[key] = self.executor.submit(self.fetch, key)
+
+    def fetch_all(self, candids, chunksize=50):
+        '''Fetch and decode the cutouts for candids into the cache without creating widgets.
+        With workers > 1 chunks of chunksize alerts are decoded in the shared process pool'''
+        keys = ['{}'.format(candid) for candid in candids]
+        if (self.workers <= 1):
+            ztf_data.fetch_png(self.bucket, keys, cache=self.cache, mode=self.mode)
+            return
+        chunks = [keys[start:start+chunksize] for start in range(0, len(keys), chunksize)]
+        fetch = partial(ztf_data.fetch_png, self.bucket, cache=self.cache, mode=self.mode,
+                        executor=ztf_data.process_pool(self.workers))
+        #one thread per worker keeps every process busy while other chunks are fetched
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(fetch, chunks))
+
+    def widget(self, candid, stamp):
+        '''Return the image widget for one stamp, reusing one widget per stamp type'''
+        if (stamp not in self.widgets):
+            image_layout=w.Layout(object_fit='cover', width="40%")
+            self.widgets[stamp] = w.Image(format='png',layout=image_layout)
+        self.widgets[stamp].value = self.load(candid)[ztf_data.STAMP_KEYS.index(stamp)]
+        return self.widgets[stamp]
+
+class LazyImage():
+    '''Handle to one cutout of an alert, decoded when first displayed'''
+    __slots__ = ['store', 'candid', 'stamp']
+
+    def __init__(self, store, candid, stamp):
+        self.store = store
+        self.candid = candid
+        self.stamp = stamp
+
+    def widget(self):
+        return self.store.widget(self.candid, self.stamp)
+
+def image_widget(image):
+    '''Return the widget for an image widget or LazyImage'''
+    if (isinstance(image, LazyImage)):
+        return image.widget()
+    return image
+
+def prefetch_images(imageList, index):
+    '''Prefetch the cutouts of the lazy images neighbouring index'''
+    image = imageList[index]
+    if (not isinstance(image, LazyImage) or image.store.neighbours == 0):
+        return
+    n = image.store.neighbours
+    image.store.prefetch([item.candid for item in imageList[max(index-n, 0):index+n+1]])
+
+def column_property(name):
+    '''Property returning a column of the LightcurveArray of a ZTF_lightcurve'''
+    def column(self):
+        try:
+            return self.lightcurve[name]
+        except KeyError:
+            raise AttributeError(name)
+    return property(column)
+
+def band_property(filt):
+    '''Property returning the row slice of one band of a ZTF_lightcurve'''
+    return property(lambda self: self.lightcurve.band_slice(filt))
 
 class ZTF_lightcurve():
-    def __init__(self, objectId, dbcon, image=False, couchbase=None):
+    filterDict = ztf_data.FILTER_IDS
+
+    #columns of the light curve, as views of self.lightcurve in filter then jd order
+    time = column_property('jd')
+    magpsf = column_property('magpsf')
+    sigmapsf = column_property('sigmapsf')
+    diffmaglim = column_property('diffmaglim')
+    magzpsci = column_property('magzpsci')
+    ra = column_property('ra')
+    decl = column_property('decl')
+    fid = column_property('fid')
+    candid = column_property('candid')
+    dc_mag = column_property('dc_mag')
+    dc_sigmag = column_property('dc_sigmag')
+
+    #row slices of each band, for the columns and the image lists
+    g = band_property('g')
+    r = band_property('r')
+    i = band_property('i')
+
+    def __init__(self, objectId, dbcon, image=False, couchbase=None, data=None, threads=1,
+                 lazy=True, neighbours=2, stretch_mode='equalize', workers=1, photometry_cache=None,
+                 zeropoints=None, paramstyle=None):
         '''PLACEHOLDER for ZTFObject Class'''
-        self.filterDict = OrderedDict({"g":1, "r":2, "i":3})
-        
         #query data base and merge with zeropoint table
-        data = pd.read_sql_query("SELECT pid, objectId, jd, magpsf, sigmapsf, magnr, sigmagnr, \
-        isdiffpos, diffmaglim ,magzpsci, ra, decl, fid, classtar, rb, \
-        candid, programid FROM alerts where objectId='{}' ORDER BY jd".format(objectId), con=dbcon)
-
-        #TODO apply seropoints
-        #dd = apply_zeropoint(zp_table, data)
-
-        #load data and index to the individual passband fluxs 
-        self.time = data.jd
-        self.sigmapsf = data.sigmapsf
-        self.diffmaglim = data.diffmaglim
-        self.magpsf = data.magpsf
-        self.magzpsci = data.magzpsci
-        self.ra = data.ra
-        self.decl = data.decl
-        self.fid = data.fid
-        self.candid = data.candid
-        self.objectId = data.objectId[0]
-        #self.dc_mag = dd['dc_mag']
-        #self.dc_sigmag = dd['dc_sigmag']
-
-        
-        self.g = data.index[data.fid==1]
-        self.r = data.index[data.fid==2]
-        self.i = data.index[data.fid==3]
-        
+        if (data is None and photometry_cache is not None):
+            data = photometry_cache.load(objectId, dbcon, paramstyle=paramstyle)
+        if (data is None):
+            with timer.stage('alerts_query', label=objectId) as stage:
+                data = pd.read_sql_query("SELECT {} FROM alerts where objectId={} \
+                ORDER BY jd".format(ztf_data.ALERT_COLUMNS, ztf_data.sql_placeholder(dbcon, paramstyle)),
+                                         con=dbcon, params=(objectId,))
+                stage.count = len(data)
+                stage.nbytes = int(data.memory_usage().sum()) if timer.enabled else 0
+
+        #keep the photometry as one record array sorted by filter then jd, from_many passes it in
+        if (isinstance(data, ztf_data.LightcurveArray)):
+            self.lightcurve = data
+        else:
+            #DC magnitudes from a ZeropointTable, from_many adds them for all objects at once
+            if (zeropoints is not None and 'dc_mag' not in data):
+                data = ztf_data.apply_zeropoints(data, zeropoints)
+            self.lightcurve = ztf_data.LightcurveArray.from_frame(data, objectId)
+        self.objectId = self.lightcurve.objectId
+        #kept for update()
+        self.dbcon = dbcon
+        self.paramstyle = paramstyle
+        self.zeropoints = zeropoints
+
         self.diffImageArray = []
         self.templateImageArray = []
         self.scienceImageArray = []
 
+        self.image_options = None
         if (image == True):
-            self.read_couchbase_objectId(couchbase)
+            self.image_options = {'couchbase_bucket': couchbase, 'lazy': lazy, 'neighbours': neighbours,
+                                  'threads': threads, 'stretch_mode': stretch_mode, 'workers': workers}
+            self.add_images(self.candid)
+
+    @classmethod
+    def from_many(cls, objectIds, dbcon, chunksize=900, photometry_cache=None, zeropoints=None, paramstyle=None,
+                  **kwargs):
+        '''Load many ZTF objects with batched queries, returned by objectId in request order.
+        Other keyword arguments are passed to ZTF_lightcurve'''
+        if (photometry_cache is not None):
+            data = photometry_cache.load_many(objectIds, dbcon, chunksize=chunksize, paramstyle=paramstyle)
+        else:
+            data = ztf_data.read_alerts_many(objectIds, dbcon, chunksize=chunksize, paramstyle=paramstyle)
+        if (zeropoints is not None):
+            data = ztf_data.apply_zeropoints(data, zeropoints)
+        lightcurves = OrderedDict()
+        for objectId, lightcurve in ztf_data.LightcurveArray.from_many(data).items():
+            lightcurves[objectId] = cls(objectId, dbcon, data=lightcurve, zeropoints=zeropoints,
+                                          paramstyle=paramstyle, **kwargs)
+        #objects without alerts are skipped
+        return OrderedDict((objectId, lightcurves[objectId]) for objectId in objectIds
+                           if objectId in lightcurves)
+
+    def update(self, data=None, dbcon=None, paramstyle=None):
+        '''Add the alerts newer than the latest point and return how many were added.
+
+        New alerts are queried from dbcon, by default the connection the object
+        was loaded from, unless a frame of pushed alerts is given; only alerts of
+        this object after the latest point are kept. Zeropoints and cutouts are
+        handled as at load, fetching only the cutouts of the new alerts'''
+        last_jd = self.lightcurve.last_jd()
+        if (data is None):
+            dbcon = self.dbcon if dbcon is None else dbcon
+            paramstyle = self.paramstyle if paramstyle is None else paramstyle
+            with timer.stage('alerts_update', label=self.objectId) as stage:
+                data = pd.read_sql_query("SELECT {} FROM alerts where objectId={} AND jd>{} \
+                ORDER BY jd".format(ztf_data.ALERT_COLUMNS, *[ztf_data.sql_placeholder(dbcon, paramstyle)]*2),
+                                         con=dbcon, params=(self.objectId, float(last_jd)))
+                stage.count = len(data)
+        else:
+            data = data[(data['objectId'] == self.objectId) & (data['jd'] > last_jd)]
+        if (len(data) == 0):
+            return 0
+        if (self.zeropoints is not None):
+            data = ztf_data.apply_zeropoints(data, self.zeropoints)
+        self.lightcurve, order = self.lightcurve.append(data)
+        if (self.image_options is not None):
+            #images of the new alerts go after the current ones, then every list takes the new row order
+            self.add_images(data['candid'].values)
+            self.diffImageArray = [self.diffImageArray[k] for k in order]
+            self.scienceImageArray = [self.scienceImageArray[k] for k in order]
+            self.templateImageArray = [self.templateImageArray[k] for k in order]
+        return len(data)
+
+    def add_images(self, candids):
+        '''Append the images of candids with the options given at load'''
+        options = dict(self.image_options)
+        if (options.pop('lazy') == True):
+            self.lazy_couchbase_objectId(candids=candids, **options)
+        else:
+            options.pop('neighbours')
+            self.read_couchbase_objectId(candids=candids, **options)
+
+    def lazy_couchbase_objectId(self, couchbase_bucket, neighbours=2, threads=1, stretch_mode='equalize',
+                                workers=1, candids=None):
+        '''Create image handles that fetch and decode each cutout when it is displayed,
+        prefetching the neighbouring epochs in the background. workers sets the
+        process pool of imageStore.fetch_all, the bulk decoding of Object_browser.
+        Handles are appended for candids, all alerts by default'''
+        if (not hasattr(self, 'imageStore')):
+            self.imageStore = CutoutStore(couchbase_bucket, neighbours=neighbours, threads=threads,
+                                          mode=stretch_mode, workers=workers)
+        for candid in (self.candid if candids is None else candids):
+            self.diffImageArray.append(LazyImage(self.imageStore, candid, 'differenceImage'))
+            self.scienceImageArray.append(LazyImage(self.imageStore, candid, 'scienceImage'))
+            self.templateImageArray.append(LazyImage(self.imageStore, candid, 'templateImage'))
+
+    def read_couchbase_objectId(self, couchbase_bucket, threads=1, chunksize=50, stretch_mode='equalize',
+                                workers=1, candids=None):
+        '''Get images based on ZTF objectId.
+
+        With threads > 1 the gets and decoding run in a thread pool, using
+        multi-gets of chunksize keys when the bucket has get_multi. With
+        workers > 1 the decoding of each chunk of chunksize alerts is sent to the
+        shared process pool of that many processes, which only returns PNG
+        bytes. Images are appended for candids, all alerts by default'''
+        keys = ['{}'.format(candid) for candid in (self.candid if candids is None else candids)]
+        if (not hasattr(couchbase_bucket, 'get_multi') and workers <= 1):
+            chunksize = 1
+        chunks = [keys[start:start+chunksize] for start in range(0, len(keys), chunksize)]
+        pool = None
+        if (workers > 1):
+            pool = ztf_data.process_pool(workers)
+            #keep every worker process busy while other chunks are being fetched
+            threads = max(threads, workers)
+        fetch = partial(ztf_data.fetch_png, couchbase_bucket, mode=stretch_mode, executor=pool)
+        if (threads > 1):
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                results = list(executor.map(fetch, chunks))
+        else:
+            results = [fetch(chunk) for chunk in chunks]
 
-    def read_couchbase_objectId(self, couchbase_bucket):
-        '''Get images based on ZTF objectId'''
         #extract images - if no image present create a blank image
-        i=0
-        for candid in self.candid:
-            try:
-                result = couchbase_bucket.get('{}'.format(candid)).value
-                diff, sci, temp =  create_widget(result)
+        #widgets are created here rather than in the worker threads
+        with timer.stage('image_widgets', count=3*len(keys), label=self.objectId):
+            image_layout=w.Layout(object_fit='cover', width="40%")
+            i=0
+            for pngs in [png for chunk in results for png in chunk]:
+                if (pngs is None):
+                    blank = blank_image()
+                    self.diffImageArray.append(blank)
+                    self.scienceImageArray.append(blank)
+                    self.templateImageArray.append(blank)
+                    continue
+                diff, sci, temp = [w.Image(value=png,format='png',layout=image_layout) for png in pngs]
                 self.diffImageArray.append(diff)
-                self.templateImageArray.append(sci)
-                self.scienceImageArray.append(temp)
-                #print (candid)
+                self.scienceImageArray.append(sci)
+                self.templateImageArray.append(temp)
                 i=i+1
-            except Exception as ex:
-                template = "An exception of type {0} occurred. Arguments:\n{1!r}"
-                message = template.format(type(ex).__name__, ex.args)
-                #print (message)
-                blank = blank_image()
-                self.diffImageArray.append(blank)
-                self.templateImageArray.append(blank)
-                self.scienceImageArray.append(blank)
         print('Number of points with images {}'.format(i))
 
     def apply_zeropoint(self, zp_table, lc):
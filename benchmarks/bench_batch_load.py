@@ -0,0 +1,33 @@
+'''Compare per-object and batched loading of ZTF_lightcurve objects'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ZTFObject import ZTF_lightcurve
+from synthetic import make_alerts_db
+
+
+def main(n_objects_list=(1000, 3000, 10000), n_alerts=20):
+    for n_objects in n_objects_list:
+        dbcon = make_alerts_db(n_objects, n_alerts)
+        objectIds = ['ZTF18{:07d}'.format(i) for i in range(n_objects)]
+
+        start = time.perf_counter()
+        single = [ZTF_lightcurve(objectId, dbcon) for objectId in objectIds]
+        t_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = ZTF_lightcurve.from_many(objectIds, dbcon)
+        t_batch = time.perf_counter() - start
+
+        assert len(single) == len(batch)
+        print('{:6d} objects: per-object {:8.3f} s  batched {:8.3f} s  speedup {:5.1f}x'.format(
+            n_objects, t_single, t_batch, t_single / t_batch))
+        dbcon.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+'''Per-step latency of Object_browser with and without prefetching'''
+import builtins
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+builtins.display = getattr(builtins, 'display', lambda *args, **kwargs: None)
+
+import ztf_data
+from ztf_data import read_alerts_many
+from object_browser import Object_browser
+from synthetic import make_alerts_db, make_bucket
+
+
+def main(n_objects=10, n_alerts=100, latency=0.001, inspect=0.5):
+    dbcon = make_alerts_db(n_objects, n_alerts)
+    objectIds = ['ZTF18{:07d}'.format(i) for i in range(n_objects)]
+    bucket = make_bucket(read_alerts_many(objectIds, dbcon).candid, latency=latency)
+    for prefetch in [0, 3]:
+        ztf_data.png_cache.clear()
+        browser = Object_browser(objectIds, dbcon, prefetch=prefetch, image=True, couchbase=bucket)
+        steps = []
+        for i in range(n_objects - 1):
+            #time spent looking at the current object
+            time.sleep(inspect)
+            start = time.perf_counter()
+            browser.next()
+            steps.append(time.perf_counter() - start)
+        print('prefetch {}: mean step {:7.1f} ms  max step {:7.1f} ms'.format(
+            prefetch, 1e3 * sum(steps) / len(steps), 1e3 * max(steps)))
+
+
+if __name__ == '__main__':
+    main()
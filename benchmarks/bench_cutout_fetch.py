@@ -0,0 +1,29 @@
+'''Compare serial and concurrent cutout fetching in read_couchbase_objectId'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ztf_data
+from ZTFObject import ZTF_lightcurve
+from synthetic import make_alerts_db, make_bucket
+
+
+def main(n_alerts=500, latency=0.002):
+    dbcon = make_alerts_db(1, n_alerts)
+    ztf = ZTF_lightcurve('ZTF180000000', dbcon)
+    for multi in [False, True]:
+        bucket = make_bucket(ztf.candid, latency=latency, multi=multi)
+        for threads in [1, 4, 16]:
+            ztf.diffImageArray, ztf.scienceImageArray, ztf.templateImageArray = [], [], []
+            ztf_data.png_cache.clear()
+            start = time.perf_counter()
+            ztf.read_couchbase_objectId(bucket, threads=threads)
+            print('multi-get {!s:5}  threads {:2d}: {:7.3f} s'.format(
+                multi, threads, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+'''Message size and update latency with and without level of detail downsampling'''
+import builtins
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+builtins.display = getattr(builtins, 'display', lambda *args, **kwargs: None)
+
+from messages import record_messages
+from lightcurve_plot import Lightcurve_plot
+from Scatter_plot import Scatter_plot
+
+
+class Lightcurve():
+    '''Minimal stand-in for ZTF_lightcurve with every point in the r band'''
+    def __init__(self, n, rng):
+        from collections import OrderedDict
+        self.objectId = 'synthetic'
+        self.filterDict = OrderedDict({"g":1, "r":2, "i":3})
+        self.time = np.sort(rng.uniform(58300, 58700, n))
+        self.magpsf = rng.normal(18, 0.5, n).astype(np.float32)
+        self.sigmapsf = rng.uniform(0.01, 0.2, n).astype(np.float32)
+        self.g = self.i = slice(0, 0)
+        self.r = slice(0, n)
+        self.scienceImageArray = []
+
+
+def timed(action):
+    with record_messages() as log:
+        start = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - start
+    return elapsed, log.total_bytes()
+
+
+def main(sizes=(10000, 100000, 1000000)):
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        lc = Lightcurve(n, rng)
+        for max_points in [None, 2000]:
+            plot = Lightcurve_plot(errorbar_mode='lines', show=False, max_points=max_points)
+            elapsed, nbytes = timed(lambda: plot.load(lc))
+            print('light curve {:8d} points max_points {!s:5}: load {:8.1f} ms {:11d} B'.format(
+                n, max_points, 1e3 * elapsed, nbytes))
+        elapsed, nbytes = timed(lambda: plot.sc_x.set_trait('min', 58400.))
+        print('light curve {:8d} points zoom: {:8.1f} ms {:11d} B'.format(n, 1e3 * elapsed, nbytes))
+
+        x = rng.lognormal(1, 1, n)
+        y = x * rng.normal(1, 0.1, n)
+        for mode, max_points in [('points', n), ('points', 5000), ('density', 5000)]:
+            elapsed, nbytes = timed(lambda: Scatter_plot(x, y, max_points=max_points, mode=mode, show=False))
+            print('scatter     {:8d} points {:7s} max_points {:7d}: create {:8.1f} ms {:11d} B'.format(
+                n, mode, max_points, 1e3 * elapsed, nbytes))
+
+
+if __name__ == '__main__':
+    main()
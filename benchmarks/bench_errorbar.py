@@ -0,0 +1,45 @@
+'''Build time and comm message size of OHLC and Lines errorbars'''
+import builtins
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+builtins.display = getattr(builtins, 'display', lambda *args, **kwargs: None)
+
+from messages import record_messages
+from lightcurve_plot import Lightcurve_plot
+
+
+def list_errorbar(plot, x, y, err_y):
+    '''Errorbars built with the original list comprehensions'''
+    import bqplot as bq
+    vals = [[yval-dy, yval+dy, yval-dy, yval+dy] for yval, dy in zip(y, err_y)]
+    return bq.OHLC(x=x, y=vals, marker='bar', scales={'x': plot.sc_x, 'y': plot.sc_y},
+                   format='ohlc', opacities=[0.3 for i in x])
+
+
+def main(sizes=(10000, 100000)):
+    rng = np.random.default_rng(0)
+    plots = {mode: Lightcurve_plot(errorbar_mode=mode) for mode in ['ohlc', 'lines']}
+    for n in sizes:
+        x = np.sort(rng.uniform(58300, 58700, n))
+        y = rng.normal(18, 0.5, n)
+        err_y = rng.uniform(0.01, 0.2, n)
+        builders = [('ohlc (lists)', lambda: list_errorbar(plots['ohlc'], list(x), list(y), list(err_y)))]
+        builders += [(mode, lambda mode=mode: plots[mode].plot_errorbar(x, y, err_y, 'red')) for mode in plots]
+        for name, build in builders:
+            with record_messages() as log:
+                start = time.perf_counter()
+                build()
+                elapsed = time.perf_counter() - start
+            print('{:7d} points {:13s}: build {:7.1f} ms  json {:10d} B  buffers {:10d} B  total {:10d} B'.format(
+                n, name, 1e3 * elapsed, log.json_bytes(), log.buffer_bytes(), log.total_bytes()))
+
+
+if __name__ == '__main__':
+    main()
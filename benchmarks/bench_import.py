@@ -0,0 +1,60 @@
+'''Cold import time of the headless data layer against the widget modules, each measured
+in a fresh interpreter.
+
+usage: python bench_import.py [repeats]'''
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+#heavy packages reported as loaded or not after each import
+HEAVY = ['pandas', 'ipywidgets', 'bqplot', 'astropy', 'PIL']
+
+SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, ' '.join(name for name in {heavy!r} if name in sys.modules))
+'''
+
+#the packages ZTFObject imported at module load before the data layer was split out
+PREVIOUS = 'import numpy, pandas, ipywidgets, astropy.io.fits, PIL.Image'
+
+#first cutout decode in a fresh interpreter, which imports PIL on demand; the synthetic
+#cutout is made first, so pandas and astropy are already loaded
+FIRST_DECODE = '''import numpy as np
+sys.path.insert(0, {benchmarks!r})
+from synthetic import make_stamp
+stamp = make_stamp(np.random.default_rng(0))
+start = time.perf_counter()
+import ztf_data
+ztf_data.stamp_png(stamp)'''.format(benchmarks=os.path.dirname(os.path.abspath(__file__)))
+
+
+def cold(statement, repeats):
+    '''Return the median seconds of statement in fresh interpreters and the heavy packages it loaded'''
+    times = []
+    for i in range(repeats):
+        output = subprocess.run([sys.executable, '-c', SCRIPT.format(statement=statement, heavy=HEAVY)],
+                                cwd=ROOT, check=True, capture_output=True, text=True).stdout.split(' ', 1)
+        times.append(float(output[0]))
+    return np.median(times), output[1].strip()
+
+
+def main(repeats=7):
+    for label, statement in [('previous ZTFObject imports', PREVIOUS),
+                             ('import ztf_data', 'import ztf_data'),
+                             ('import ztf_data, period_pipeline', 'import ztf_data, period_pipeline'),
+                             ('import ZTFObject', 'import ZTFObject'),
+                             ('import lightcurve_plot', 'import lightcurve_plot'),
+                             ('ztf_data + first decode, pandas loaded', FIRST_DECODE)]:
+        seconds, loaded = cold(statement, repeats)
+        print('{:34s} {:8.1f} ms  loaded: {}'.format(label, 1e3 * seconds, loaded))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,84 @@
+'''Latency and message size of adding new alerts to an open light curve, fed by SQLite
+inserts or pushed frames, against reloading the object and the plot.
+
+usage: python bench_live_update.py [n_history] [n_new]'''
+import builtins
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+builtins.display = getattr(builtins, 'display', lambda *args, **kwargs: None)
+
+from messages import record_messages
+from synthetic import make_alerts, make_bucket
+from ZTFObject import ZTF_lightcurve
+from lightcurve_plot import Lightcurve_plot
+
+
+def feed(n_history, n_new):
+    '''Return a SQLite connection holding the first n_history alerts of one object,
+    the n_new later alerts to insert and a bucket with the cutouts of all of them'''
+    alerts = make_alerts(1, n_history + n_new).sort_values('jd').reset_index(drop=True)
+    dbcon = sqlite3.connect(':memory:', check_same_thread=False)
+    alerts.iloc[:n_history].to_sql('alerts', dbcon, index=False)
+    dbcon.execute('CREATE INDEX alerts_objectId ON alerts (objectId, jd)')
+    return dbcon, alerts.iloc[n_history:], make_bucket(alerts.candid, multi=True)
+
+
+def session(n_history, n_new, mode, lazy=True):
+    '''Open the object and add n_new alerts one at a time.
+    mode is 'poll' (insert, then query), 'push' (hand the frame over) or 'reload'.
+    Returns the latency per alert and the bytes sent per alert'''
+    dbcon, new, bucket = feed(n_history, n_new)
+    options = {'image': True, 'couchbase': bucket, 'lazy': lazy}
+    ztf = ZTF_lightcurve(new.objectId.iloc[0], dbcon, **options)
+    plot = Lightcurve_plot(show=False)
+    plot.load(ztf)
+    latency = []
+    with record_messages() as log:
+        for i in range(len(new)):
+            row = new.iloc[i:i+1]
+            if (mode != 'push'):
+                row.to_sql('alerts', dbcon, index=False, if_exists='append')
+            start = time.perf_counter()
+            if (mode == 'reload'):
+                ztf = ZTF_lightcurve(ztf.objectId, dbcon, **options)
+                plot.load(ztf)
+            else:
+                assert plot.update(ztf, data=row if mode == 'push' else None) == 1
+            latency.append(time.perf_counter() - start)
+
+    #the updated object matches a fresh load
+    if (mode == 'push'):
+        new.to_sql('alerts', dbcon, index=False, if_exists='append')
+    fresh = ZTF_lightcurve(ztf.objectId, dbcon, **options)
+    assert len(ztf.candid) == n_history + n_new
+    assert np.array_equal(fresh.candid, ztf.candid)
+    if (lazy == True):
+        assert [image.candid for image in ztf.diffImageArray] == list(fresh.candid)
+    for filt, ztf_filt in zip(plot.filters, ztf.filterDict.keys()):
+        assert np.array_equal(plot.x[filt], fresh.time[getattr(fresh, ztf_filt)])
+    return np.array(latency), log.total_bytes() / n_new
+
+
+def main(n_history=1000, n_new=50):
+    print('{} alerts, {} new alerts added one at a time'.format(n_history, n_new))
+    for mode, lazy in [('reload', True), ('poll', True), ('push', True), ('reload', False),
+                       ('poll', False), ('push', False)]:
+        #eager loads print the number of images of every update
+        with contextlib.redirect_stdout(io.StringIO()):
+            latency, sent = session(n_history, n_new, mode, lazy=lazy)
+        print('{:7s} {:6s} images: median {:8.2f} ms  max {:8.2f} ms  {:10.0f} B sent per alert'.format(
+            mode, 'lazy' if lazy else 'eager', 1e3 * np.median(latency), 1e3 * latency.max(), sent))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
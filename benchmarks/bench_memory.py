@@ -0,0 +1,75 @@
+'''Memory held by many loaded light curves: per-object pandas frames as ZTF_lightcurve kept
+them before, against the LightcurveArray records now kept.
+
+usage: python bench_memory.py [n_objects] [n_alerts] [n_frames]'''
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ZTFObject import ZTF_lightcurve
+from ztf_data import LightcurveArray
+from synthetic import make_alerts
+
+
+def frames(data):
+    '''The previous layout: one frame per object kept alive by its Series attributes,
+    plus the row index of every band'''
+    lightcurves = {}
+    for objectId, group in data.groupby('objectId', sort=False):
+        group = group.reset_index(drop=True)
+        lightcurves[objectId] = (group, group.index[group.fid==1], group.index[group.fid==2],
+                                 group.index[group.fid==3])
+    return lightcurves
+
+
+def ztf_lightcurves(data):
+    return {objectId: ZTF_lightcurve(objectId, None, data=lightcurve)
+            for objectId, lightcurve in LightcurveArray.from_many(data).items()}
+
+
+def measure(build, data):
+    '''Return the memory still allocated after build(data) returns, the peak and the time'''
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(data)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held, peak, elapsed
+
+
+def main(n_objects=100000, n_alerts=20, n_frames=20000):
+    data = make_alerts(n_objects, n_alerts)
+    lightcurves = LightcurveArray.from_many(data)
+    lc = lightcurves['ZTF18{:07d}'.format(n_objects - 1)]
+    group = data[data.objectId == lc.objectId]
+    assert np.allclose(np.sort(lc['jd']), np.sort(group.jd.values))
+    for filt, fid in [('g', 1), ('r', 2), ('i', 3)]:
+        assert np.all(lc.band(filt)['fid'] == fid)
+        assert np.all(np.diff(lc.band(filt)['jd']) >= 0)
+    del lightcurves
+
+    print('{} objects x {} alerts'.format(n_objects, n_alerts))
+    #the frames take minutes under tracemalloc, they are measured on at most n_frames objects
+    subset = data.iloc[:min(n_objects, n_frames)*n_alerts]
+    for label, build, alerts in [('pandas frames', frames, subset),
+                                 ('LightcurveArray.from_many', LightcurveArray.from_many, data),
+                                 ('ZTF_lightcurve on LightcurveArray', ztf_lightcurves, data)]:
+        n = len(alerts) // n_alerts
+        held, peak, elapsed = measure(build, alerts)
+        print('{:34s} {:7d} objects  held {:8.1f} MB ({:6.0f} B/object)  peak {:8.1f} MB  {:6.2f} s'.format(
+            label, n, held / 1e6, held / n, peak / 1e6, elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,57 @@
+'''Throughput of the batch period pipeline, and a restart after an interruption'''
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from period_pipeline import compute_periods, read_periods
+from synthetic import make_alerts_db
+
+
+def main(n_objects=400, n_alerts=200, n_frequencies=20000, workers_list=(1, 2, 4)):
+    dbcon = make_alerts_db(n_objects, n_alerts)
+    objectIds = ['ZTF18{:07d}'.format(i) for i in range(n_objects)] + ['ZTF18missing']
+    print('{} objects x {} alerts, {} frequencies, {} cpus'.format(n_objects, n_alerts, n_frequencies, os.cpu_count()))
+    for workers in workers_list:
+        directory = tempfile.mkdtemp()
+        try:
+            start = time.perf_counter()
+            periods = compute_periods(objectIds, dbcon, directory, workers=workers, batch_size=50,
+                                      n_frequencies=n_frequencies, progress=None)
+            elapsed = time.perf_counter() - start
+            print('workers {}: {:6.2f} s, {:6.1f} objects/s, {} periods'.format(
+                workers, elapsed, len(periods) / elapsed, len(periods)))
+        finally:
+            shutil.rmtree(directory)
+
+    #stop after the first batches, then restart
+    directory = tempfile.mkdtemp()
+    try:
+        messages = []
+        def interrupt(message):
+            messages.append(message)
+            if (len(messages) == 2):
+                raise KeyboardInterrupt
+        try:
+            compute_periods(objectIds, dbcon, directory, batch_size=50, n_frequencies=n_frequencies, progress=interrupt)
+        except KeyboardInterrupt:
+            pass
+        print('interrupted after {} objects'.format(len(read_periods(directory))))
+        start = time.perf_counter()
+        periods = compute_periods(objectIds, dbcon, directory, batch_size=50, n_frequencies=n_frequencies)
+        print('restart: {:6.2f} s, {} periods, {} unique'.format(
+            time.perf_counter() - start, len(periods), periods.objectId.nunique()))
+        assert np.all(np.isnan(periods.fit_period[periods.objectId == 'ZTF18missing']))
+    finally:
+        shutil.rmtree(directory)
+        dbcon.close()
+
+
+if __name__ == '__main__':
+    main()
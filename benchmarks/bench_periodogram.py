@@ -0,0 +1,62 @@
+'''Chunked multi-band Lomb-Scargle periodogram for thousands of points and 100k frequencies'''
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from periodogram import lomb_scargle, frequency_grid
+
+
+def make_lightcurve(n, rng, period=0.37):
+    '''Return times, magnitudes, errors and bands of a sinusoidal light curve in three bands'''
+    t = np.sort(rng.uniform(58300, 58700, n))
+    bands = rng.integers(0, 3, n)
+    y = 18 + np.array([0., 0.4, -0.2])[bands] + 0.3 * np.sin(2 * np.pi * t / period) + rng.normal(0, 0.05, n)
+    return t, y, rng.uniform(0.03, 0.1, n), bands
+
+
+def main(sizes=(1000, 3000, 10000), n_frequencies=100000):
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        t, y, dy, bands = make_lightcurve(n, rng)
+        frequencies = frequency_grid(t, n_frequencies=n_frequencies)
+        start = time.perf_counter()
+        power = lomb_scargle(t, y, dy, bands, frequencies)
+        elapsed = time.perf_counter() - start
+        #the peak memory is set by the chunk size, not the number of frequencies
+        tracemalloc.start()
+        lomb_scargle(t, y, dy, bands, frequencies[:5000])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        #sin and cos evaluated for every frequency of an irregular grid, timed on 5000 frequencies
+        irregular = np.sort(rng.uniform(frequencies[0], frequencies[-1], 5000))
+        start = time.perf_counter()
+        lomb_scargle(t, y, dy, bands, irregular)
+        direct = (time.perf_counter() - start) * len(frequencies) / len(irregular)
+        print('{:6d} points x {} frequencies: {:6.2f} s ({:5.1f} ns per pair), peak memory {:5.1f} MB, '
+              'period {:.4f} d; irregular grid ~{:6.2f} s'.format(
+                  n, len(frequencies), elapsed, 1e9 * elapsed / (n * len(frequencies)), peak / 2**20,
+                  1. / frequencies[np.argmax(power)], direct))
+
+    try:
+        from astropy.timeseries import LombScargleMultiband
+    except ImportError:
+        return
+    t, y, dy, bands = make_lightcurve(1000, rng)
+    frequencies = frequency_grid(t, n_frequencies=10000)
+    start = time.perf_counter()
+    LombScargleMultiband(t, y, bands, dy, nterms_base=1, nterms_band=0).power(frequencies)
+    print('astropy LombScargleMultiband, 1000 points x 10000 frequencies: {:7.2f} s'.format(
+        time.perf_counter() - start))
+    start = time.perf_counter()
+    lomb_scargle(t, y, dy, bands, frequencies)
+    print('lomb_scargle,                 1000 points x 10000 frequencies: {:7.2f} s'.format(
+        time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+'''Cold and warm loads of light curves through the on-disk photometry cache'''
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ZTFObject import ZTF_lightcurve
+from ztf_data import PhotometryCache
+from synthetic import make_alerts_db
+
+
+def timed(action):
+    start = time.perf_counter()
+    result = action()
+    return time.perf_counter() - start, result
+
+
+def main(n_objects=2000, n_alerts=200, latency=0.02, n_single=50):
+    dbcon = make_alerts_db(n_objects, n_alerts, latency=latency)
+    objectIds = ['ZTF18{:07d}'.format(i) for i in range(n_objects)]
+    directory = tempfile.mkdtemp()
+    try:
+        print('{} objects x {} alerts, {:.0f} ms per query'.format(n_objects, n_alerts, 1e3 * latency))
+        elapsed, _ = timed(lambda: ZTF_lightcurve.from_many(objectIds, dbcon))
+        print('from_many  database only        {:8.3f} s'.format(elapsed))
+        for label, check in [('cold', True), ('warm, max jd check', True), ('warm, no check', False)]:
+            cache = PhotometryCache(directory, check=check)
+            elapsed, lightcurves = timed(lambda: ZTF_lightcurve.from_many(objectIds, dbcon, photometry_cache=cache))
+            assert len(lightcurves) == n_objects
+            print('from_many  {:21s} {:8.3f} s  {}'.format(label, elapsed, cache.stats()))
+
+        shutil.rmtree(directory)
+        elapsed, _ = timed(lambda: [ZTF_lightcurve(objectId, dbcon) for objectId in objectIds[:n_single]])
+        print('per object database only        {:8.2f} ms'.format(1e3 * elapsed / n_single))
+        for label, check in [('cold', True), ('warm, max jd check', True), ('warm, no check', False)]:
+            cache = PhotometryCache(directory, check=check)
+            elapsed, _ = timed(lambda: [ZTF_lightcurve(objectId, dbcon, photometry_cache=cache)
+                                        for objectId in objectIds[:n_single]])
+            print('per object {:21s} {:8.2f} ms'.format(label, 1e3 * elapsed / n_single))
+
+        #new alerts make the cached object stale
+        dbcon.execute("INSERT INTO alerts (objectId, jd, fid, candid, pid, programid, isdiffpos) \
+        VALUES (?, 2459000.5, 2, 1, 1, 1, 't')", [objectIds[0]])
+        cache = PhotometryCache(directory)
+        lc = ZTF_lightcurve(objectIds[0], dbcon, photometry_cache=cache)
+        print('after insert: {} alerts, {}'.format(len(lc.time), cache.stats()))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        dbcon.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+'''Scaling of process-pool cutout decoding in read_couchbase_objectId'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ztf_data
+from ZTFObject import ZTF_lightcurve
+from synthetic import make_alerts_db, make_bucket
+
+
+def main(n_alerts=1000, workers_list=(1, 2, 4, 8)):
+    dbcon = make_alerts_db(1, n_alerts)
+    ztf = ZTF_lightcurve('ZTF180000000', dbcon)
+    bucket = make_bucket(ztf.candid, multi=True)
+    print('{} alerts, {} cpus'.format(n_alerts, os.cpu_count()))
+    for workers in workers_list:
+        ztf_data.png_cache.clear()
+        ztf.diffImageArray, ztf.scienceImageArray, ztf.templateImageArray = [], [], []
+        start = time.perf_counter()
+        ztf.read_couchbase_objectId(bucket, workers=workers)
+        print('workers {}: {:7.3f} s'.format(workers, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+'''Brush, interval and lasso selection with the grid index against a full scan'''
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from grid_index import GridIndex, points_in_polygon
+
+
+def timed(action, repeat=5):
+    start = time.perf_counter()
+    for i in range(repeat):
+        result = action()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(sizes=(100000, 1000000, 10000000)):
+    rng = np.random.default_rng(0)
+    polygon = np.array([(1., 1.), (3., 1.), (3., 3.), (2., 1.5)])
+    for n in sizes:
+        x = rng.lognormal(1, 1, n)
+        y = x * rng.normal(1, 0.1, n)
+        elapsed, index = timed(lambda: GridIndex(x, y), repeat=1)
+        print('{:9d} rows: build index {:8.1f} ms'.format(n, 1e3 * elapsed))
+        for xmin, xmax in [(1., 1.01), (1., 2.), (0., 100.)]:
+            box = (xmin, xmax, xmin, xmax)
+            scan, rows = timed(lambda: np.flatnonzero((x >= xmin) & (x <= xmax) & (y >= xmin) & (y <= xmax)))
+            count, _ = timed(lambda: index.count_rectangle(*box))
+            listed, _ = timed(lambda: index.rectangle(*box))
+            interval, _ = timed(lambda: index.count_interval(xmin, xmax))
+            print('{:9d} rows {:9d} selected: scan {:8.2f} ms  count {:8.2f} ms  rows {:8.2f} ms  '
+                  'interval count {:6.3f} ms'.format(n, len(rows), 1e3 * scan, 1e3 * count, 1e3 * listed, 1e3 * interval))
+        scan, rows = timed(lambda: np.flatnonzero(points_in_polygon(x, y, polygon)))
+        listed, _ = timed(lambda: index.polygon(polygon))
+        print('{:9d} rows {:9d} in polygon: scan {:8.2f} ms  index {:8.2f} ms'.format(n, len(rows), 1e3 * scan, 1e3 * listed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+'''Rendering a selection as full HTML against the paged Selection_table'''
+import asyncio
+import builtins
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+builtins.display = getattr(builtins, 'display', lambda *args, **kwargs: None)
+
+from messages import record_messages
+from Scatter_plot import Scatter_plot
+from selection_table import Selection_table
+
+#columns shown in TrojanScatterPlot.ipynb
+COLUMNS = ['ztfname_x', 'Nobs', 'Nights', 'mag_med', 'sig_med', 'fit_period', 'period', 'fit_amp', 'AmpMax', 'U']
+
+
+def make_table(n, rng):
+    table = pd.DataFrame({'ztfname_x': ['ZTF18{:07d}'.format(i) for i in range(n)],
+                          'Nobs': rng.integers(10, 500, n), 'Nights': rng.integers(5, 100, n),
+                          'mag_med': rng.normal(18, 1, n), 'sig_med': rng.uniform(0.01, 0.2, n),
+                          'fit_period': rng.lognormal(1, 1, n), 'fit_amp': rng.uniform(0, 1, n),
+                          'AmpMax': rng.uniform(0, 1, n), 'U': rng.integers(0, 4, n)})
+    table['period'] = table['fit_period'] * rng.normal(1, 0.1, n)
+    for i in range(20):
+        table['extra{}'.format(i)] = rng.normal(size=n)
+    return table
+
+
+def main(n=200000, sizes=(100, 1000, 10000)):
+    rng = np.random.default_rng(0)
+    table = make_table(n, rng)
+    scatter = Scatter_plot(table['fit_period'].values, table['period'].values, show=False)
+    selection_table = Selection_table(table, scatter, columns=COLUMNS, delay=0, show=False)
+    for size in sizes:
+        rows = np.sort(rng.choice(n, size, replace=False))
+        start = time.perf_counter()
+        html = table.iloc[rows].to_html()
+        full = time.perf_counter() - start
+        with record_messages() as log:
+            start = time.perf_counter()
+            scatter.select_rows(rows)
+            paged = time.perf_counter() - start
+        print('{:7d} selected: full table {:9.1f} ms {:11d} B   paged {:7.1f} ms {:8d} B'.format(
+            size, 1e3 * full, len(html), 1e3 * paged, log.total_bytes()))
+
+    #a burst of brush moves is rendered once, the render is queued on the event loop
+    selection_table.delay = 0.2
+    async def burst():
+        for xmax in np.linspace(1.5, 5., 20):
+            scatter.select_rectangle(1., xmax, 1., xmax)
+        await asyncio.sleep(0.5)
+    with record_messages() as log:
+        asyncio.run(burst())
+    print('20 selections within the debounce delay: {} HTML updates'.format(
+        sum(1 for name, keys, nbytes, buffers in log.messages if name == 'HTML' and 'value' in keys)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''Per-stamp cost of the PIL equalization path versus the NumPy stretch engine'''
+import operator
+import os
+import sys
+import time
+from functools import reduce
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ztf_data import stretch, STRETCH_MODES
+
+
+def equalize_reduce(im):
+    '''Original pure-Python equalization lookup table'''
+    h = im.convert("L").histogram()
+    lut = []
+    for b in range(0, len(h), 256):
+        step = reduce(operator.add, h[b:b+256]) / 255
+        n = 0
+        for i in range(256):
+            lut.append(n / step)
+            n = n + h[i+b]
+    return im.point(lut*3)
+
+
+def before(data):
+    im = Image.fromarray(data)
+    im = im.convert('RGB')
+    return equalize_reduce(im)
+
+
+def main(n_stamps=3000):
+    rng = np.random.default_rng(0)
+    stamps = rng.normal(100, 10, (n_stamps, 63, 63)).astype(np.float32)
+
+    start = time.perf_counter()
+    for data in stamps:
+        before(data)
+    t_before = time.perf_counter() - start
+    print('{:12s} {:8.1f} us/stamp'.format('PIL reduce', 1e6 * t_before / n_stamps))
+
+    for mode in STRETCH_MODES:
+        start = time.perf_counter()
+        for data in stamps:
+            stretch(data, mode=mode)
+        t_after = time.perf_counter() - start
+        print('{:12s} {:8.1f} us/stamp'.format(mode, 1e6 * t_after / n_stamps))
+
+
+if __name__ == '__main__':
+    main()
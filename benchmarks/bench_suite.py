@@ -0,0 +1,63 @@
+'''Stage timings of loading and plotting one object at 10 to 10000 alerts, from a synthetic
+SQLite alerts table and gzipped FITS cutouts in an in-memory bucket.
+
+usage: python bench_suite.py [n_alerts ...]'''
+import builtins
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+builtins.display = getattr(builtins, 'display', lambda *args, **kwargs: None)
+
+from synthetic import make_alerts_db, make_bucket, make_zeropoints
+import ztf_data
+from ZTFObject import ZTF_lightcurve
+from ztf_data import ZeropointTable
+from lightcurve_plot import Lightcurve_plot
+from timing import timer
+
+
+def session(n_alerts, zeropoints=False):
+    '''Load one object with all of its cutouts, plot it and toggle the filters,
+    returning the stage summary and the total wall time'''
+    dbcon = make_alerts_db(1, n_alerts)
+    candids = pd.read_sql_query('SELECT candid FROM alerts', dbcon).candid
+    bucket = make_bucket(candids, multi=True)
+    table = None
+    if (zeropoints == True):
+        pid = pd.read_sql_query('SELECT pid FROM alerts', dbcon).pid.values
+        table = ZeropointTable(make_zeropoints(pid))
+    ztf_data.png_cache.clear()
+
+    timer.clear()
+    timer.enable()
+    start = time.perf_counter()
+    ztf = ZTF_lightcurve('ZTF18{:07d}'.format(0), dbcon, image=True, couchbase=bucket, lazy=False,
+                         zeropoints=table)
+    plot = Lightcurve_plot(show=False)
+    plot.load(ztf, magnitude='dc_mag' if zeropoints == True else 'magpsf')
+    for item in plot.filter_items:
+        item.value = not item.value
+    plot.sc_x.min, plot.sc_x.max = ztf.time.min(), np.median(ztf.time)
+    elapsed = time.perf_counter() - start
+    timer.disable()
+    return timer.summary(), elapsed
+
+
+def main(sizes=(10, 100, 1000, 10000)):
+    pd.set_option('display.width', 120)
+    for n_alerts in sizes:
+        summary, elapsed = session(n_alerts, zeropoints=True)
+        print('{} alerts: {:.3f} s total'.format(n_alerts, elapsed))
+        print(summary.to_string(float_format='{:.4f}'.format))
+        print()
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or (10, 100, 1000, 10000))
@@ -0,0 +1,67 @@
+'''Comm message sizes of the plots, split into JSON and binary buffers.
+tests/test_transport.py checks that mark data is sent as binary arrays, not lists'''
+import builtins
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+builtins.display = getattr(builtins, 'display', lambda *args, **kwargs: None)
+
+from messages import record_messages
+from lightcurve_plot import Lightcurve_plot
+from Scatter_plot import Scatter_plot
+from bench_downsample import Lightcurve
+
+
+def lightcurve_session(lc, **kwargs):
+    '''Create a plot, load an object, fold it and toggle the filters'''
+    plot = Lightcurve_plot(show=False, **kwargs)
+    plot.load(lc)
+    plot.fold_button.value = True
+    plot.period_text.value = 0.5
+    plot.fold_button.value = False
+    plot.filter_items[0].value = True
+
+
+def scatter_session(x, y, **kwargs):
+    '''Create a scatter plot, zoom in and select a rectangle'''
+    plot = Scatter_plot(x, y, show=False, **kwargs)
+    plot.sc_x.min, plot.sc_x.max = 1., 1.5
+    plot.sc_y.min, plot.sc_y.max = 1., 1.5
+    plot.select_rectangle(1., 1.2, 1., 1.2)
+
+
+def report(label, log):
+    print('{:38s} JSON {:10d} B  binary {:10d} B  total {:10d} B  lists {}'.format(
+        label, log.json_bytes(), log.buffer_bytes(), log.total_bytes(), len(log.list_payloads())))
+
+
+def main(n=10000):
+    rng = np.random.default_rng(0)
+    lc = Lightcurve(n, rng)
+    x = rng.lognormal(1, 1, 100000)
+    y = x * rng.normal(1, 0.1, len(x))
+
+    for mode in ['ohlc', 'lines']:
+        with record_messages() as log:
+            lightcurve_session(lc, errorbar_mode=mode)
+        report('light curve {} points, {} errorbars'.format(n, mode), log)
+
+    for mode in ['points', 'density']:
+        with record_messages() as log:
+            scatter_session(x, y, mode=mode, max_points=len(x))
+        report('scatter {} points, {}'.format(len(x), mode), log)
+
+    #the same points serialized as JSON lists, as before the marks took arrays
+    import json
+    as_lists = len(json.dumps({'x': lc.time.tolist(), 'y': lc.magpsf.tolist()}))
+    print('light curve x and y as JSON lists: {} B, as float64/float32 buffers: {} B'.format(
+        as_lists, 12 * n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''DC magnitudes for a million alerts: per-object apply_zeropoint against the batch engine'''
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ZTFObject import ZTF_lightcurve
+from ztf_data import ZeropointTable, apply_zeropoints
+from synthetic import make_alerts, make_zeropoints
+
+
+def main(n_objects=5000, n_alerts=200, n_sample=50):
+    #negative DC fluxes give NaN magnitudes, pandas warns about them
+    warnings.simplefilter('ignore', RuntimeWarning)
+    alerts = make_alerts(n_objects, n_alerts)
+    #several alerts share each exposure
+    alerts['pid'] = alerts['pid'] % (len(alerts) // 10)
+    zp_table = make_zeropoints(alerts['pid'].values)
+    groups = [group.reset_index(drop=True) for objectId, group in alerts.groupby('objectId', sort=False)]
+    print('{} alerts, {} objects, {} zeropoints'.format(len(alerts), n_objects, len(zp_table)))
+
+    start = time.perf_counter()
+    for group in groups[:n_sample]:
+        ZTF_lightcurve.apply_zeropoint(None, zp_table, group)
+    per_object = (time.perf_counter() - start) / n_sample
+    print('apply_zeropoint per object       {:8.2f} ms  ({:.1f} s for all objects)'.format(
+        1e3 * per_object, per_object * n_objects))
+
+    start = time.perf_counter()
+    merged = ZTF_lightcurve.apply_zeropoint(None, zp_table, alerts)
+    print('apply_zeropoint on all alerts    {:8.2f} s'.format(time.perf_counter() - start))
+
+    start = time.perf_counter()
+    zeropoints = ZeropointTable(zp_table)
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = apply_zeropoints(alerts, zeropoints)
+    print('ZeropointTable index {:6.3f} s, apply_zeropoints on all alerts {:6.3f} s'.format(
+        indexed, time.perf_counter() - start))
+
+    #rows without a zeropoint are dropped by the merge and NaN in the batch result
+    batch = batch[np.isfinite(batch['pabszp'].values)].sort_values('candid')
+    merged = merged.sort_values('candid')
+    for column in ['dc_flux', 'dc_sigflux', 'dc_mag', 'dc_sigmag']:
+        assert np.allclose(batch[column].values, merged[column].values, equal_nan=True), column
+    print('dc columns match on {} rows'.format(len(batch)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+'''Record the comm messages sent by widgets without a running kernel'''
+import json
+from contextlib import contextmanager
+
+import ipywidgets as w
+from ipywidgets.widgets.widget import _remove_buffers
+
+
+class MessageLog():
+    '''Messages sent by widgets as (widget class, state keys, JSON bytes, buffer bytes)'''
+    def __init__(self):
+        self.messages = []
+        #(widget class, state key, length) of every list longer than one item sent as JSON
+        self.lists = []
+
+    def add(self, widget, state, buffers):
+        self.messages.append((type(widget).__name__, sorted(state.keys()),
+                              len(json.dumps(state, default=str)),
+                              sum(memoryview(b).nbytes for b in buffers)))
+        for key, value in state.items():
+            if (isinstance(value, (list, tuple)) and len(value) > 1
+                    and all(isinstance(item, (int, float)) or item is None for item in value)):
+                self.lists.append((type(widget).__name__, key, len(value)))
+
+    def json_bytes(self):
+        return sum(m[2] for m in self.messages)
+
+    def buffer_bytes(self):
+        return sum(m[3] for m in self.messages)
+
+    def total_bytes(self):
+        return self.json_bytes() + self.buffer_bytes()
+
+    def list_payloads(self, min_length=2):
+        '''Return the numeric lists of at least min_length items that were sent as JSON'''
+        return [item for item in self.lists if item[2] >= min_length]
+
+
+@contextmanager
+def record_messages():
+    '''Capture the state sent by every widget opened or updated inside the with block'''
+    log = MessageLog()
+    send, open_ = w.Widget._send, w.Widget.open
+
+    def _send(self, msg, buffers=None):
+        log.add(self, msg.get('state', {}), buffers or [])
+
+    def _open(self):
+        opened = self.comm is not None
+        open_(self)
+        if (not opened):
+            state, buffer_paths, buffers = _remove_buffers(self.get_state())
+            log.add(self, state, buffers)
+
+    w.Widget._send, w.Widget.open = _send, _open
+    try:
+        yield log
+    finally:
+        w.Widget._send, w.Widget.open = send, open_
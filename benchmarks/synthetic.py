@@ -0,0 +1,121 @@
+'''Synthetic ZTF alert data for offline benchmarks'''
+import base64
+import gzip
+import io
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+
+
+def make_alerts(n_objects, n_alerts, seed=0):
+    '''Return a DataFrame of synthetic alerts with n_alerts per object'''
+    rng = np.random.default_rng(seed)
+    n = n_objects * n_alerts
+    objectIds = np.repeat(['ZTF18{:07d}'.format(i) for i in range(n_objects)], n_alerts)
+    return pd.DataFrame({
+        'pid': rng.integers(0, 10**9, n),
+        'objectId': objectIds,
+        'jd': 2458300. + rng.uniform(0, 400, n),
+        'magpsf': rng.normal(18, 0.5, n),
+        'sigmapsf': rng.uniform(0.01, 0.2, n),
+        'magnr': rng.normal(19, 0.5, n),
+        'sigmagnr': rng.uniform(0.01, 0.2, n),
+        'isdiffpos': rng.choice(['t', 'f'], n),
+        'diffmaglim': rng.normal(20.5, 0.3, n),
+        'magzpsci': rng.normal(26, 0.1, n),
+        'ra': rng.uniform(0, 360, n),
+        'decl': rng.uniform(-30, 90, n),
+        'fid': rng.integers(1, 4, n),
+        'classtar': rng.uniform(0, 1, n),
+        'rb': rng.uniform(0, 1, n),
+        'candid': np.arange(n, dtype=np.int64) + 10**17,
+        'programid': rng.integers(1, 3, n),
+    })
+
+
+def make_zeropoints(pid, missing=0.1, seed=0):
+    '''Return a zeropoint table (pid, pabszp, pabszpunc) for a fraction 1 - missing of the unique pids'''
+    rng = np.random.default_rng(seed)
+    pid = np.unique(pid)
+    pid = pid[rng.uniform(size=len(pid)) >= missing]
+    return pd.DataFrame({'pid': rng.permutation(pid),
+                         'pabszp': rng.normal(26, 0.1, len(pid)),
+                         'pabszpunc': rng.uniform(0.001, 0.01, len(pid))})
+
+
+class SlowCursor(sqlite3.Cursor):
+    '''Cursor that sleeps latency seconds per query, like a round trip to a remote database'''
+    latency = 0.
+
+    def execute(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return super().execute(*args, **kwargs)
+
+
+class SlowConnection(sqlite3.Connection):
+    '''SQLite connection whose cursors sleep latency seconds per query'''
+    latency = 0.
+
+    def cursor(self, factory=SlowCursor):
+        cursor = super().cursor(factory)
+        cursor.latency = self.latency
+        return cursor
+
+
+def make_alerts_db(n_objects, n_alerts, path=':memory:', seed=0, latency=0.):
+    '''Create a SQLite connection holding a synthetic alerts table,
+    queries sleep latency seconds when latency is set'''
+    #allow the connection to be used from prefetch threads
+    dbcon = sqlite3.connect(path, check_same_thread=False, factory=SlowConnection)
+    dbcon.latency = latency
+    make_alerts(n_objects, n_alerts, seed=seed).to_sql('alerts', dbcon, index=False)
+    dbcon.execute('CREATE INDEX alerts_objectId ON alerts (objectId)')
+    return dbcon
+
+
+def make_stamp(rng, shape=(63, 63)):
+    '''Return a gzipped FITS cutout with a noisy point source'''
+    from astropy.io import fits
+    y, x = np.mgrid[0:shape[0], 0:shape[1]]
+    data = rng.normal(100, 10, shape) + 500 * np.exp(-((x - shape[1] // 2)**2 + (y - shape[0] // 2)**2) / 8.)
+    output = io.BytesIO()
+    fits.PrimaryHDU(data.astype(np.float32)).writeto(output)
+    return gzip.compress(output.getvalue())
+
+
+def make_result(rng):
+    '''Return a couchbase-style document holding the three base64 encoded cutouts'''
+    return {key: base64.b64encode(make_stamp(rng)).decode('ascii')
+            for key in ['differenceImage', 'scienceImage', 'templateImage']}
+
+
+class Result():
+    '''Stand-in for a couchbase ValueResult'''
+    def __init__(self, value):
+        self.value = value
+
+
+class MemoryBucket():
+    '''In-memory stand-in for a couchbase bucket that sleeps latency seconds per request'''
+    def __init__(self, documents, latency=0., multi=False):
+        self.documents = documents
+        self.latency = latency
+        if (multi):
+            self.get_multi = self._get_multi
+
+    def get(self, key):
+        time.sleep(self.latency)
+        return Result(self.documents[key])
+
+    def _get_multi(self, keys, quiet=False):
+        time.sleep(self.latency)
+        return {key: Result(self.documents[key]) for key in keys if key in self.documents}
+
+
+def make_bucket(candids, latency=0., multi=False, n_unique=50, seed=0):
+    '''Create a MemoryBucket with a document for every candid, reusing n_unique cutout triplets'''
+    rng = np.random.default_rng(seed)
+    results = [make_result(rng) for i in range(min(n_unique, len(candids)))]
+    documents = {'{}'.format(candid): results[i % len(results)] for i, candid in enumerate(candids)}
+    return MemoryBucket(documents, latency=latency, multi=multi)
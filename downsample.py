@@ -0,0 +1,64 @@
+import numpy as np
+
+def window_indices(x, xmin=None, xmax=None):
+    '''Return the indices of the points with xmin <= x <= xmax'''
+    mask = np.isfinite(x)
+    if (xmin is not None):
+        mask &= (x >= xmin)
+    if (xmax is not None):
+        mask &= (x <= xmax)
+    return np.flatnonzero(mask)
+
+def minmax_indices(x, y, n_bins, xmin=None, xmax=None):
+    '''Return the sorted indices of the points with the minimum and maximum y in
+    each of n_bins equal x columns between xmin and xmax (the data range by default)'''
+    index = window_indices(x, xmin, xmax)
+    if (len(index) <= 2*n_bins):
+        return index
+    xw = x[index]
+    lo = xw.min() if xmin is None else xmin
+    hi = xw.max() if xmax is None else xmax
+    if (hi <= lo):
+        return index[[np.nanargmin(y[index]), np.nanargmax(y[index])]]
+    bins = np.minimum(((xw - lo) / (hi - lo) * n_bins).astype(np.intp), n_bins - 1)
+    #group the points by column, time series are usually sorted already
+    if (np.any(bins[1:] < bins[:-1])):
+        order = np.argsort(bins, kind='stable')
+    else:
+        order = np.arange(len(bins))
+    sorted_bins = bins[order]
+    yb = y[index][order]
+    starts = np.flatnonzero(np.r_[True, sorted_bins[1:] != sorted_bins[:-1]])
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(order)]))
+    keep = []
+    for reduce in [np.fmin, np.fmax]:
+        #first point of each column equal to the column minimum (maximum)
+        extreme = reduce.reduceat(yb, starts)
+        hit = np.flatnonzero(yb == extreme[group])
+        keep.append(order[hit[np.r_[True, group[hit][1:] != group[hit][:-1]]]])
+    return index[np.unique(np.concatenate(keep))]
+
+def density_indices(x, y, n_bins=100, per_bin=5, xmin=None, xmax=None, ymin=None, ymax=None):
+    '''Return the sorted indices of at most per_bin points in each cell of an
+    n_bins x n_bins grid over the window, so sparse regions keep every point'''
+    index = window_indices(x, xmin, xmax)
+    index = index[window_indices(y[index], ymin, ymax)]
+    if (len(index) <= per_bin):
+        return index
+    cells = grid_cells(x[index], y[index], n_bins, xmin, xmax, ymin, ymax)
+    order = np.argsort(cells, kind='stable')
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    #rank of each point within its cell
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return np.sort(index[order[rank < per_bin]])
+
+def grid_cells(x, y, n_bins, xmin=None, xmax=None, ymin=None, ymax=None):
+    '''Return the flattened n_bins x n_bins grid cell of every point'''
+    cells = []
+    for values, lo, hi in [(x, xmin, xmax), (y, ymin, ymax)]:
+        lo = values.min() if lo is None else lo
+        hi = values.max() if hi is None else hi
+        scale = n_bins / (hi - lo) if hi > lo else 0.
+        cells.append(np.clip(((values - lo) * scale).astype(np.intp), 0, n_bins - 1))
+    return cells[0] * n_bins + cells[1]
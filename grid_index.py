@@ -0,0 +1,213 @@
+import numpy as np
+
+def points_in_polygon(x, y, vertices):
+    '''Return a mask of the points inside the polygon (even-odd rule)'''
+    vertices = np.asarray(vertices, dtype=np.float64)
+    inside = np.zeros(len(x), dtype=bool)
+    x0, y0 = vertices[-1]
+    for x1, y1 in vertices:
+        #edges crossing the horizontal line through each point, to the right of the point
+        crosses = (y1 > y) != (y0 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (y - y1) * (x0 - x1) / (y0 - y1)
+        inside ^= crosses & (x < x_cross)
+        x0, y0 = x1, y1
+    return inside
+
+class GridIndex():
+    '''n_bins x n_bins grid over x/y with the rows of each cell stored contiguously,
+    column by column, so a rectangle is resolved from at most n_bins slices.
+    The cell edges are quantiles of x and y so skewed data does not pile up in a
+    few cells. A summed area table of the cell counts counts rectangles without
+    listing their rows, and the rows sorted by x resolve x intervals with a binary search'''
+
+    def __init__(self, x, y, n_bins=256):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.n_bins = n_bins
+        rows = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        if (len(rows) == 0):
+            self.bounds = (0., 1., 0., 1.)
+        else:
+            self.bounds = (self.x[rows].min(), self.x[rows].max(), self.y[rows].min(), self.y[rows].max())
+        #rows sorted by x for interval selections
+        x_order = np.argsort(self.x[rows])
+        self.x_rows = rows[x_order]
+        self.x_sorted = self.x[self.x_rows]
+        #cell edges at the quantiles of x, and of a sample of y
+        quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+        if (len(rows) == 0):
+            self.edges = (np.zeros(n_bins - 1), np.zeros(n_bins - 1))
+        else:
+            sample = self.y[rows[::max(1, len(rows) // 100000)]]
+            self.edges = (self.x_sorted[(quantiles * (len(rows) - 1)).astype(np.intp)], np.quantile(sample, quantiles))
+        #searching sorted values is several times faster than searching in row order
+        cells = np.empty(len(rows), dtype=np.intp)
+        cells[x_order] = self.cell(self.x_sorted, 0)
+        cells = cells * n_bins + self.cell(self.y[rows], 1)
+        #a stable sort of 16 bit keys is a radix sort
+        order = np.argsort(cells.astype(np.uint16) if n_bins <= 256 else cells, kind='stable')
+        #rows sorted by cell with their coordinates and the offset of each cell,
+        #the last entry is the number of rows
+        self.rows = rows[order]
+        self.cell_x = self.x[self.rows]
+        self.cell_y = self.y[self.rows]
+        self.offsets = np.searchsorted(cells[order], np.arange(n_bins**2 + 1))
+        counts = np.diff(self.offsets).reshape(n_bins, n_bins)
+        self.table = np.zeros((n_bins + 1, n_bins + 1), dtype=np.int64)
+        self.table[1:, 1:] = counts.cumsum(axis=0).cumsum(axis=1)
+
+    def cell(self, values, axis):
+        '''Return the grid column (axis 0) or row (axis 1) of values'''
+        return np.searchsorted(self.edges[axis], values, side='right')
+
+    def cell_positions(self, ix0, ix1, iy0, iy1):
+        '''Return the positions in rows of the cells in columns ix0..ix1 and rows iy0..iy1'''
+        if (ix0 > ix1 or iy0 > iy1):
+            return np.zeros(0, dtype=np.intp)
+        columns = np.arange(ix0, ix1 + 1) * self.n_bins
+        starts = self.offsets[columns + iy0]
+        lengths = self.offsets[columns + iy1 + 1] - starts
+        if (lengths.sum() == 0):
+            return np.zeros(0, dtype=np.intp)
+        #positions of the concatenated slices starts[i]:starts[i]+lengths[i]
+        return np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+
+    def clip(self, xmin=None, xmax=None, ymin=None, ymax=None):
+        '''Return the rectangle clipped to the data bounds, None bounds are open'''
+        xmin = self.bounds[0] if xmin is None else max(xmin, self.bounds[0])
+        xmax = self.bounds[1] if xmax is None else min(xmax, self.bounds[1])
+        ymin = self.bounds[2] if ymin is None else max(ymin, self.bounds[2])
+        ymax = self.bounds[3] if ymax is None else min(ymax, self.bounds[3])
+        return xmin, xmax, ymin, ymax
+
+    def candidates(self, xmin=None, xmax=None, ymin=None, ymax=None):
+        '''Return the positions in rows of every cell overlapping the rectangle, None bounds are open'''
+        xmin, xmax, ymin, ymax = self.clip(xmin, xmax, ymin, ymax)
+        if (xmin > xmax or ymin > ymax):
+            return np.zeros(0, dtype=np.intp)
+        ix0, ix1 = self.cell([xmin, xmax], 0)
+        iy0, iy1 = self.cell([ymin, ymax], 1)
+        return self.cell_positions(ix0, ix1, iy0, iy1)
+
+    def in_rectangle(self, x, y, xmin=None, xmax=None, ymin=None, ymax=None):
+        '''Return a mask of the coordinates inside the rectangle'''
+        xmin, xmax, ymin, ymax = self.clip(xmin, xmax, ymin, ymax)
+        return (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+
+    def rectangle(self, xmin=None, xmax=None, ymin=None, ymax=None):
+        '''Return the sorted rows inside the rectangle, None bounds are open'''
+        positions = self.candidates(xmin, xmax, ymin, ymax)
+        if (len(positions) > len(self.rows) // 4):
+            #scanning every row in order is cheaper than sorting a large selection
+            return np.flatnonzero(self.in_rectangle(self.x, self.y, xmin, xmax, ymin, ymax))
+        inside = self.in_rectangle(self.cell_x[positions], self.cell_y[positions], xmin, xmax, ymin, ymax)
+        return np.sort(self.rows[positions[inside]])
+
+    def count_rectangle(self, xmin=None, xmax=None, ymin=None, ymax=None):
+        '''Return the number of rows inside the rectangle, only the rows of the
+        cells on its border are tested'''
+        cxmin, cxmax, cymin, cymax = self.clip(xmin, xmax, ymin, ymax)
+        if (cxmin > cxmax or cymin > cymax):
+            return 0
+        ix0, ix1 = self.cell([cxmin, cxmax], 0)
+        iy0, iy1 = self.cell([cymin, cymax], 1)
+        #cells strictly inside the border are fully covered
+        interior = (self.table[ix1, iy1] - self.table[ix0 + 1, iy1]
+                    - self.table[ix1, iy0 + 1] + self.table[ix0 + 1, iy0 + 1]) if (ix1 - ix0 > 1 and iy1 - iy0 > 1) else 0
+        border = [self.cell_positions(ix0, ix0, iy0, iy1)]
+        if (ix1 > ix0):
+            border.append(self.cell_positions(ix1, ix1, iy0, iy1))
+        border.append(self.cell_positions(ix0 + 1, ix1 - 1, iy0, iy0))
+        if (iy1 > iy0):
+            border.append(self.cell_positions(ix0 + 1, ix1 - 1, iy1, iy1))
+        border = np.concatenate(border)
+        return int(interior + self.in_rectangle(self.cell_x[border], self.cell_y[border], xmin, xmax, ymin, ymax).sum())
+
+    def interval_slice(self, xmin=None, xmax=None):
+        '''Return the slice of x_rows with xmin <= x <= xmax'''
+        start = 0 if xmin is None else np.searchsorted(self.x_sorted, xmin, side='left')
+        stop = len(self.x_sorted) if xmax is None else np.searchsorted(self.x_sorted, xmax, side='right')
+        return slice(start, max(start, stop))
+
+    def interval(self, xmin=None, xmax=None):
+        '''Return the sorted rows with xmin <= x <= xmax'''
+        return np.sort(self.x_rows[self.interval_slice(xmin, xmax)])
+
+    def count_interval(self, xmin=None, xmax=None):
+        '''Return the number of rows with xmin <= x <= xmax'''
+        s = self.interval_slice(xmin, xmax)
+        return s.stop - s.start
+
+    def polygon(self, vertices):
+        '''Return the sorted rows inside the polygon'''
+        vertices = np.asarray(vertices, dtype=np.float64)
+        positions = self.candidates(vertices[:, 0].min(), vertices[:, 0].max(),
+                                    vertices[:, 1].min(), vertices[:, 1].max())
+        if (len(positions) > len(self.rows) // 4):
+            return np.flatnonzero(points_in_polygon(self.x, self.y, vertices))
+        inside = points_in_polygon(self.cell_x[positions], self.cell_y[positions], vertices)
+        return np.sort(self.rows[positions[inside]])
+
+class Selection():
+    '''Rows of a GridIndex inside a region: a rectangle, an x interval, a polygon
+    or an explicit array of rows. The count is available first and the rows
+    are only listed when a page is requested'''
+
+    def __init__(self, index, kind, region):
+        self.index = index
+        self.kind = kind
+        self.region = region
+        self._count = None
+        self._rows = None
+
+    @classmethod
+    def from_rows(cls, index, rows):
+        selection = cls(index, 'rows', None)
+        selection._rows = np.sort(np.asarray(rows, dtype=np.intp))
+        return selection
+
+    def __len__(self):
+        if (self._count is None):
+            if (self._rows is not None):
+                self._count = len(self._rows)
+            elif (self.kind == 'rectangle'):
+                self._count = self.index.count_rectangle(*self.region)
+            elif (self.kind == 'interval'):
+                self._count = self.index.count_interval(*self.region)
+            else:
+                self._count = len(self.rows())
+        return self._count
+
+    def rows(self):
+        '''Return the sorted selected rows'''
+        if (self._rows is None):
+            if (self.kind == 'rectangle'):
+                self._rows = self.index.rectangle(*self.region)
+            elif (self.kind == 'interval'):
+                self._rows = self.index.interval(*self.region)
+            elif (self.kind == 'polygon'):
+                self._rows = self.index.polygon(self.region)
+        return self._rows
+
+    def page(self, page, page_size=50):
+        '''Return the selected rows of one page'''
+        return self.rows()[page*page_size:(page + 1)*page_size]
+
+    def contains(self, rows):
+        '''Return a mask of the given rows that are selected, without listing the selection'''
+        x, y = self.index.x[rows], self.index.y[rows]
+        if (self.kind == 'rectangle'):
+            return self.index.in_rectangle(x, y, *self.region)
+        if (self.kind == 'interval'):
+            xmin, xmax = self.region
+            #only indexed rows, those with finite coordinates, are in the interval
+            mask = np.isfinite(x) & np.isfinite(y)
+            if (xmin is not None):
+                mask &= (x >= xmin)
+            if (xmax is not None):
+                mask &= (x <= xmax)
+            return mask
+        if (self.kind == 'polygon'):
+            return points_in_polygon(x, y, self.region)
+        return np.isin(rows, self._rows)
@@ -1,43 +1,93 @@
+import functools
 import ipywidgets as w
 from ipywidgets import Layout, Box
+import traceback
 import bqplot as bq
 import numpy as np
+from ZTFObject import image_widget, prefetch_images
+from ztf_data import MAGNITUDE_ERRORS
+from downsample import minmax_indices
+from periodogram import best_period, frequency_grid
+from timing import timer
 
-#debugging output to widget                                 
-out = w.Output(layout={'border': '1px solid black'})
+#debugging output to widget, created on first use so importing needs no kernel
+out = None
+
+def output():
+    '''Return the debugging output widget, creating it on first use'''
+    global out
+    if (out is None):
+        out = w.Output(layout={'border': '1px solid black'})
+    return out
+
+def capture(method):
+    '''Decorator sending the prints and errors of a widget callback to output()'''
+    @functools.wraps(method)
+    def captured(*args, **kwargs):
+        with output():
+            return method(*args, **kwargs)
+    return captured
     
     
 class Lightcurve_plot():
     '''plot utility for lightcurves'''
     
     
-    def __init__(self, filters = ['G', 'R', 'I'], filter_button_colors = ['green','red','magenta']):
-        '''Initialize plot widget'''
+    def __init__(self, filters = ['G', 'R', 'I'], filter_button_colors = ['green','red','magenta'],
+                 errorbar_mode='lines', show=True, max_points=None):
+        '''Initialize plot widget, errorbar_mode is 'lines' or 'ohlc'.
+        Mark data is sent as binary arrays, times as float64 and magnitudes as float32;
+        bqplot only takes the per-bar opacities of 'ohlc' as a list.
+        'lines' sends about 36 bytes per point against 29 for 'ohlc', since every segment
+        repeats its time, but is drawn as one SVG path per filter instead of one element
+        per bar and is built without validating the opacities list.
+        Set show to False to embed self.widget in another widget instead of displaying it.
+        With max_points each filter sends at most about max_points points for the
+        visible time range, and is refined when zooming in with the mouse'''
 
         #define filters
         self.filters = filters
         self.filter_button_colors = filter_button_colors
         self.n_filters = len(self.filters)
+        self.errorbar_mode = errorbar_mode
+        self.max_points = max_points
 
-        #initialize data
-        self.x = []
-        self.data = []
-        self.err = []
-        self.diffImage = []
-        self.tempImage = []
-        self.sciImage = []
+        #initialize data, per filter arrays keyed by filter name
+        self.x = {}
+        self.data = {}
+        self.err = {}
+        self.diffImage = {}
+        self.tempImage = {}
+        self.sciImage = {}
+        #indices of the points sent to the marks in level of detail mode, and their time range
+        self.shown = {}
+        self.shown_range = None
+        #fold mode plots phase = ((time - t0) / period) % 1
+        self.fold = False
+        self.period = None
+        self.t0 = 0.
+        #magnitude column of the shown object, the object polled by poll() and its pending call
+        self.magnitude = 'magpsf'
+        self.polled = None
+        self.poll_loop = None
+        self.poll_handle = None
 
         #define scales for axes 
         self.sc_x = bq.LinearScale()
         self.sc_y = bq.LinearScale(reverse=True)
+        if (self.max_points is not None):
+            self.sc_x.observe(self.domain_change, ['min', 'max'])
        
-        #initial widgets
+        #initial widgets, marks are created once and reused for every object
+        self.create_marks()
         self.filter_togglebuttons()
+        self.fold_buttons()
         self.initialize_widget()
         
         
         #plot initial widget
-        self.plot()
+        if (show == True):
+            self.plot()
         
     def set_title (self, name):
         '''Set object name'''
@@ -75,22 +125,69 @@ class Lightcurve_plot():
         for item in self.filter_items:
             item.observe(self.filter_change, 'value')
 
-    def fold_radiobutton(self):
-        '''Create fold it radio button'''
-        self.fold_button = w.RadioButtons(
-            options=['fold'],
-            #     value='pineapple',
-            description='Fold lightcurve',
-            disabled=False
-        )
-        self.fold_radiobutton.observe(self.set_fold, 'value')
+    def fold_buttons(self):
+        '''Create the fold toggle, the period box and the find period button'''
+        self.fold_button = w.ToggleButton(value=False, description='Fold', tooltip='Plot the phase of the period',
+                                          layout=Layout(width='30%'))
+        self.period_text = w.FloatText(value=0., description='Period', tooltip='Period (days)',
+                                       layout=Layout(width='45%'), style={'description_width': '40px'})
+        self.period_button = w.Button(description='Find', tooltip='Period of the periodogram peak',
+                                      layout=Layout(width='25%'))
+        self.fold_button.observe(self.set_fold, 'value')
+        self.period_text.observe(self.period_change, 'value')
+        self.period_button.on_click(self.find_period)
+        self.fold_box = w.HBox([self.fold_button, self.period_text, self.period_button],
+                               layout=Layout(width='{}%'.format(100./(self.n_filters + 1))))
 
     def set_fold(self, change):
-        '''Set fold lightcurve parameter'''
-        if (change.new == True):
-            self.fold = True
-        else:
-            self.fold = False
+        '''Set fold lightcurve parameter, remapping the points of the existing marks'''
+        self.fold = change.new
+        if (self.fold == True and not self.period):
+            self.set_period(self.periodogram())
+        self.xax.label = 'Phase' if self.fold == True else 'Time (MJD)'
+        #the zoomed time range does not apply to phases, the marks are pushed before the
+        #held min and max notifications, which then find the range already shown
+        with self.sc_x.hold_trait_notifications():
+            self.sc_x.min = None
+            self.sc_x.max = None
+            self.update_marks()
+
+    def set_period(self, period):
+        '''Set the fold period without replotting'''
+        self.period = period
+        self.period_text.value = period if period else 0.
+
+    def period_change(self, change):
+        '''Replot with the period typed in the period box'''
+        if (change.new != (self.period or 0.)):
+            self.period = change.new
+            if (self.fold == True):
+                self.update_marks()
+
+    def periodogram(self, minimum_period=0.05, maximum_period=None, n_frequencies=None):
+        '''Return the period of the multi-band Lomb-Scargle peak of the loaded object, None without data.
+        The bands share the sinusoid and have their own mean magnitude. Asteroid
+        light curves are double peaked, so their rotation period is twice this period'''
+        filters = [filt for filt in self.filters if len(self.x.get(filt, [])) > 0]
+        if (len(filters) == 0):
+            return None
+        t = np.concatenate([self.x[filt] for filt in filters])
+        bands = np.repeat(np.arange(len(filters)), [len(self.x[filt]) for filt in filters])
+        frequencies = frequency_grid(t, minimum_period, maximum_period, n_frequencies=n_frequencies)
+        period, frequencies, power = best_period(t, np.concatenate([self.data[filt] for filt in filters]),
+                                                 np.concatenate([self.err[filt] for filt in filters]),
+                                                 bands, frequencies)
+        return period
+
+    def find_period(self, button=None):
+        '''Set the period to the periodogram peak'''
+        self.set_period(self.periodogram())
+        if (self.fold == True):
+            self.update_marks()
+
+    def phase(self, x):
+        '''Return the phase of times x for the fold period'''
+        return ((x - self.t0) / self.period) % 1.
 
     def get_selected_filters(self, filter_marks):
         '''return the list of selected filters'''
@@ -110,46 +207,107 @@ class Lightcurve_plot():
                 display_legend=True)
         scatt.colors = [color]
         scatt.label = filt
-        if ((y != [])):
+        if (len(y) > 0):
             scatt.x = x
             scatt.y = y
         scatt.on_element_click(self.plot_images)
         
         return scatt
 
+    def errorbar_data(self, x=[], y=[], err_y=[]):
+        '''Return the data of an errorbar mark: NaN separated segments of a Lines
+        mark, or OHLC format if errorbar_mode is 'ohlc' '''
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float32)
+        err_y = np.asarray(err_y, dtype=np.float32)
+        if (self.errorbar_mode == 'lines'):
+            gaps = np.full(len(x), np.nan)
+            return {'x': np.column_stack([x, x, gaps]).ravel(),
+                    'y': np.column_stack([y-err_y, y+err_y, gaps.astype(np.float32)]).ravel()}
+        return {'x': x, 'y': np.column_stack([y-err_y, y+err_y, y-err_y, y+err_y]),
+                'opacities': [0.3]*len(x)}
+
     def plot_errorbar(self, x=[], y=[], err_y = [],  color='red'):
-        '''Create and return errorbars using OHLC format'''
-        vals = [[yval-dy,yval+dy,yval-dy,yval+dy] for yval,dy in zip(y,err_y)]
-        #print(vals[0], y[0])                                                                                                      
-        ohlc = bq.OHLC(x=x, y=vals, marker='bar', scales={'x': self.sc_x, 'y': self.sc_y}, 
-                            format='ohlc', opacities=[0.3 for i in x] )
-        ohlc.color=[color]
+        '''Create and return errorbars as a Lines mark, or using OHLC format if errorbar_mode is 'ohlc' '''
+        data = self.errorbar_data(x, y, err_y)
+        if (self.errorbar_mode == 'lines'):
+            return bq.Lines(scales={'x': self.sc_x, 'y': self.sc_y}, colors=[color], opacities=[0.3], **data)
+        ohlc = bq.OHLC(marker='bar', scales={'x': self.sc_x, 'y': self.sc_y}, format='ohlc', **data)
+        ohlc.stroke = color
         return ohlc
     
-    def filter_change(self, change):
-        '''plot passbands selected from checkboxes'''
-        plot_filters = self.get_selected_filters(self.filter_items)
-        scatt_marks = []
-        #add scatter and error bars to array of marks
-        for filt in plot_filters:
+    def create_marks(self):
+        '''Create empty scatter and errorbar marks for every filter'''
+        self.scatter_marks = []
+        self.errorbar_marks = []
+        for i, filt in enumerate(self.filters):
             #create scatterplot
-            i =  self.filters.index(filt)
-            scatter = self.plot_scatter(self.x[i], self.data[i], self.filter_button_colors[i], filt)
-            scatt_marks.append(scatter)
+            scatter = self.plot_scatter(color=self.filter_button_colors[i], filt=filt)
+            self.scatter_marks.append(scatter)
             #create errorbars
-            errorbars = self.plot_errorbar(self.x[i], self.data[i], self.err[i])
-            errorbars.stroke = self.filter_button_colors[i]
-            scatt_marks.append(errorbars)
-        
-        #update lightcurve plot so show points
-        self.lightcurve.marks = scatt_marks
+            errorbars = self.plot_errorbar(color=self.filter_button_colors[i])
+            self.errorbar_marks.append(errorbars)
+
+    def lod_indices(self, x, y):
+        '''Return the indices of the points to send in level of detail mode, None to send all points.
+        The points with the minimum and maximum magnitude in each time column of the visible
+        range are kept, so the envelope of the light curve is preserved'''
+        if (self.max_points is None or len(x) <= self.max_points):
+            return None
+        return minmax_indices(x, y, self.max_points // 2, self.sc_x.min, self.sc_x.max)
+
+    def update_marks(self, filters=None):
+        '''Push the current data of filters, by default every filter, to the existing marks'''
+        self.shown_range = (self.sc_x.min, self.sc_x.max)
+        with timer.stage('mark_update', count=0) as stage:
+            for filt in (self.filters if filters is None else filters):
+                i = self.filters.index(filt)
+                x = self.x.get(filt, np.zeros(0))
+                if (self.fold == True and self.period):
+                    x = self.phase(x)
+                y = self.data.get(filt, np.zeros(0))
+                err = self.err.get(filt, np.zeros(0))
+                index = self.lod_indices(x, y)
+                self.shown[filt] = index
+                if (index is not None):
+                    x, y, err = x[index], y[index], err[index]
+                with self.scatter_marks[i].hold_sync():
+                    self.scatter_marks[i].x = x
+                    self.scatter_marks[i].y = y.astype(np.float32)
+                with self.errorbar_marks[i].hold_sync():
+                    for name, value in self.errorbar_data(x, y, err).items():
+                        #NaN gaps never compare equal, so unchanged Lines data would be sent again
+                        if (not np.array_equal(getattr(self.errorbar_marks[i], name), value, equal_nan=True)):
+                            setattr(self.errorbar_marks[i], name, value)
+                stage.count += len(x)
+                stage.nbytes += self.scatter_marks[i].x.nbytes + self.scatter_marks[i].y.nbytes
+
+    def domain_change(self, change):
+        '''Resample the light curves for the new time range. A frontend message sets min and
+        max before either is notified, so the second notification finds the range shown'''
+        if ((self.sc_x.min, self.sc_x.max) != self.shown_range):
+            self.update_marks()
+
+    def filter_change(self, change):
+        '''plot passbands selected from checkboxes'''
+        with timer.stage('filter_change'):
+            plot_filters = self.get_selected_filters(self.filter_items)
+            scatt_marks = []
+            #add the existing scatter and error bars to array of marks, no data is resent
+            for filt in plot_filters:
+                i =  self.filters.index(filt)
+                scatt_marks.append(self.scatter_marks[i])
+                scatt_marks.append(self.errorbar_marks[i])
+
+            #update lightcurve plot so show points
+            self.lightcurve.marks = scatt_marks
 
     def lightcurve_widget(self):
         '''Create light curve widget'''
-        xax = bq.Axis(label='Time (MJD)', scale=self.sc_x,
+        self.xax = bq.Axis(label='Time (MJD)', scale=self.sc_x,
                         grid_lines='solid',
                         label_location="middle")
-        xax.tick_style={'stroke': 'black', 'font-size': 12}
+        self.xax.tick_style={'stroke': 'black', 'font-size': 12}
 
         yax = bq.Axis(label='Magnitude', scale=self.sc_y,
                         orientation='vertical', tick_format='0.1f',
@@ -157,19 +315,27 @@ class Lightcurve_plot():
         yax.tick_style={'stroke': 'black', 'font-size': 12}
 
         panzoom = bq.PanZoom(scales={'x': [self.sc_x], 'y': [self.sc_y]})
-        return bq.Figure(axes=[xax, yax], marks=[],
+        #zooming refines the level of detail, so only enable it in that mode
+        interaction = panzoom if self.max_points is not None else None
+        return bq.Figure(axes=[self.xax, yax], marks=[], interaction=interaction,
                         layout=Layout(width='100%', height='auto'),
                         fig_margin = {'top': 0, 'bottom': 40, 'left': 50, 'right': 0},
                          legend_location='top-right',
                          )
 
-    @out.capture()
+    @capture
     def plot_images(self, plot, target):
         '''Create list of images'''
-        i =  self.filter_button_colors.index(plot.colors[0])
+        filt = self.filters[self.filter_button_colors.index(plot.colors[0])]
+        index = target['data']['index']
+        if (filt not in self.diffImage):
+            return
+        if (self.shown.get(filt) is not None):
+            index = self.shown[filt][index]
 
-        self.image_box.children = [self.diffImage[i][target['data']['index']], self.sciImage[i][target['data']['index']], 
-                                   self.tempImage[i][target['data']['index']]]
+        self.image_box.children = [image_widget(self.diffImage[filt][index]), image_widget(self.sciImage[filt][index]), 
+                                   image_widget(self.tempImage[filt][index])]
+        prefetch_images(self.diffImage[filt], index)
 
 
     def print_event(self, target):
@@ -212,12 +378,11 @@ class Lightcurve_plot():
         #create widgets using layout
         self.set_title('')           
         self.title_box = w.Box(children=self.title_items, layout=title_layout)
-        self.filter_box = w.Box(children=self.filter_items, layout=fullspan_layout)                                                                
+        self.filter_box = w.Box(children=self.filter_items + [self.fold_box], layout=fullspan_layout)                                                                
         self.lightcurve = self.lightcurve_widget()
         self.scatter_box = Box(children=[self.lightcurve], layout=eighty_span_layout) 
         self.image_box = Box(children=[], layout=twenty_span_layout)   
         
-        #self.fold_radiobutton()
         self.plot_box = w.HBox([self.scatter_box,self.image_box])
         #position widgets using widget size
         self.widget = w.VBox([self.title_box, self.filter_box,self.plot_box], layout=w.Layout(height='350px'))
@@ -226,29 +391,108 @@ class Lightcurve_plot():
         '''plot display'''
         display(self.widget)
 
-    def loadZTF(self, ztf, initial_filt='R'):
-        '''Plot a ZTF object'''
-        self.set_title(ztf.objectId) 
-        
+    def clear(self):
+        '''Remove the current object, keeping the figure, scales, marks and buttons'''
+        self.stop_polling()
+        self.x = {}
+        self.data = {}
+        self.err = {}
+        self.diffImage = {}
+        self.tempImage = {}
+        self.sciImage = {}
+        self.set_title('')
+        self.image_box.children = []
+        self.set_period(None)
+        self.update_marks()
+
+    def load(self, ztf, initial_filt='R', magnitude='magpsf'):
+        '''Plot a ZTF object, replacing any object already shown.
+        magnitude is 'magpsf' or 'dc_mag' for objects loaded with zeropoints'''
+        self.stop_polling()
+        with timer.stage('plot_load', count=len(ztf.time), label=ztf.objectId):
+            self.x = {}
+            self.data = {}
+            self.err = {}
+            self.diffImage = {}
+            self.tempImage = {}
+            self.sciImage = {}
+            self.set_title(ztf.objectId)
+            self.image_box.children = []
+            self.magnitude = magnitude
+            self.partition(ztf)
+            #the period of the previous object does not apply, find the new one when folded
+            time = np.asarray(ztf.time)
+            self.t0 = np.nanmin(time) if len(time) > 0 else 0.
+            self.set_period(self.periodogram() if self.fold == True else None)
+            self.update_marks()
+
+            #define which data set to plot
+            i =  self.filters.index(initial_filt)
+            self.filter_items[i].value = True
 
-        #partition data by filter
-        for filt in ztf.filterDict.keys():
-            index = getattr(ztf, filt)
-            self.x.append(ztf.time.loc[index].values)
-            self.data.append(ztf.magpsf.loc[index].values)
-            self.err.append(ztf.sigmapsf.loc[index].values)
+    def partition(self, ztf):
+        '''Split the data of ztf into per filter arrays and return the filters whose length changed'''
+        #the bands are row slices of the filter-sorted columns, copied into contiguous float arrays
+        time = np.asarray(ztf.time)
+        magpsf = np.asarray(getattr(ztf, self.magnitude))
+        sigmapsf = np.asarray(getattr(ztf, MAGNITUDE_ERRORS[self.magnitude]))
+        changed = []
+        for filt, ztf_filt in zip(self.filters, ztf.filterDict.keys()):
+            index = getattr(ztf, ztf_filt)
+            x = np.ascontiguousarray(time[index], dtype=np.float64)
+            if (len(x) != len(self.x.get(filt, []))):
+                changed.append(filt)
+            self.x[filt] = x
+            self.data[filt] = np.ascontiguousarray(magpsf[index], dtype=np.float64)
+            self.err[filt] = np.ascontiguousarray(sigmapsf[index], dtype=np.float64)
             if (len(ztf.scienceImageArray) != 0):
-                imageList = [ztf.scienceImageArray[i] for i in index.values]
-                self.sciImage.append(imageList)
-                imageList = [ztf.diffImageArray[i] for i in index.values]
-                self.diffImage.append(imageList)
-                imageList = [ztf.templateImageArray[i] for i in index.values]
-                self.tempImage.append(imageList)
-        
-        self.x = np.asarray(self.x)
-        self.data = np.asarray(self.data)
-        self.err = np.asarray(self.err)
-        
-        #define which data set to plot
-        i =  self.filters.index(initial_filt)
-        self.filter_items[i].value = True
+                self.sciImage[filt] = ztf.scienceImageArray[index]
+                self.diffImage[filt] = ztf.diffImageArray[index]
+                self.tempImage[filt] = ztf.templateImageArray[index]
+        return changed
+
+    def update(self, ztf, **kwargs):
+        '''Add the alerts of the shown object ztf that are newer than its latest point and
+        return how many were added. Keyword arguments are passed to ztf.update. Only the
+        marks of filters with new points are resent; the figure, fold and filter
+        selection are kept and the auto-scaled axes follow the new points'''
+        n_new = ztf.update(**kwargs)
+        if (n_new > 0):
+            with timer.stage('plot_append', count=n_new, label=ztf.objectId):
+                self.update_marks(self.partition(ztf))
+        return n_new
+
+    def poll(self, ztf, interval=60.):
+        '''Call update(ztf) every interval seconds on the kernel's event loop until
+        stop_polling() or another object is loaded. The updates run on the thread of
+        the loop, the one that loaded ztf, so its connection can be used. Polling
+        stops at the first failed update, which is reported once'''
+        from tornado.ioloop import IOLoop
+        self.stop_polling()
+        self.polled = ztf
+        self.poll_loop = IOLoop.current()
+        def tick():
+            self.poll_handle = None
+            #a call already due when polling stopped or another object was loaded
+            if (self.polled is not ztf):
+                return
+            try:
+                self.update(ztf)
+            except Exception:
+                self.polled = None
+                print('Polling {} stopped after a failed update:'.format(ztf.objectId))
+                traceback.print_exc()
+                return
+            self.poll_handle = self.poll_loop.call_later(interval, tick)
+        self.poll_handle = self.poll_loop.call_later(interval, tick)
+
+    def stop_polling(self):
+        '''Stop the updates started by poll()'''
+        self.polled = None
+        if (self.poll_handle is not None):
+            self.poll_loop.remove_timeout(self.poll_handle)
+            self.poll_handle = None
+
+    def loadZTF(self, ztf, initial_filt='R', magnitude='magpsf'):
+        '''Plot a ZTF object'''
+        self.load(ztf, initial_filt=initial_filt, magnitude=magnitude)
@@ -0,0 +1,119 @@
+import ipywidgets as w
+from ipywidgets import Layout
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import ztf_data
+from ZTFObject import ZTF_lightcurve
+from lightcurve_plot import Lightcurve_plot
+
+
+class Object_browser():
+    '''Step through a list of ZTF objects, prefetching the next objects in the background'''
+
+    def __init__(self, objectIds, dbcon, prefetch=3, initial_filt='R', magnitude='magpsf', plot_options=None,
+                 **kwargs):
+        '''Initialize browser widget.
+
+        The next prefetch objects are loaded in a background thread while the
+        current one is shown. All loads run on that one thread, so dbcon is
+        never used concurrently (sqlite3 connections need check_same_thread=False).
+        magnitude='dc_mag' plots DC magnitudes and needs zeropoints=ZeropointTable(...).
+        Other keyword arguments are passed to ZTF_lightcurve'''
+        self.objectIds = list(objectIds)
+        self.dbcon = dbcon
+        self.n_prefetch = prefetch
+        self.initial_filt = initial_filt
+        self.magnitude = magnitude
+        self.kwargs = kwargs
+        self.index = None
+
+        #loaded or loading objects by index, bounded by the prefetch window
+        self.pending = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        #start the shared decoding processes here rather than from the prefetch thread
+        if (kwargs.get('image', False) == True and kwargs.get('workers', 1) > 1):
+            ztf_data.process_pool(kwargs['workers'])
+
+        self.lightcurve_plot = Lightcurve_plot(show=False, **({} if plot_options is None else plot_options))
+        self.initialize_widget()
+        self.plot()
+        if (len(self.objectIds) > 0):
+            self.show(0)
+
+    def load_object(self, objectId):
+        '''Load a ZTF object and decode its cutouts into the cache'''
+        ztf = ZTF_lightcurve(objectId, self.dbcon, **self.kwargs)
+        if (hasattr(ztf, 'imageStore')):
+            ztf.imageStore.fetch_all(ztf.candid)
+        return ztf
+
+    def submit(self, index):
+        '''Queue the load of the object at index unless it is already queued'''
+        if (index not in self.pending):
+            self.pending[index] = self.executor.submit(self.load_object, self.objectIds[index])
+        return self.pending[index]
+
+    def prefetch(self, index):
+        '''Queue the objects following index and cancel loads outside the window,
+        the previous object is kept so stepping back is immediate'''
+        window = range(max(index - 1, 0), min(index + self.n_prefetch + 1, len(self.objectIds)))
+        for key in list(self.pending.keys()):
+            if (key not in window):
+                #running loads cannot be cancelled, their result is dropped
+                self.pending.pop(key).cancel()
+        for i in window:
+            self.submit(i)
+
+    def show(self, index):
+        '''Show the object at index'''
+        index = max(0, min(index, len(self.objectIds) - 1))
+        self.index = index
+        future = self.submit(index)
+        self.prefetch(index)
+        self.position.value = ' {} / {}'.format(index + 1, len(self.objectIds))
+        if (self.jump.value != index):
+            self.jump.value = index
+        try:
+            ztf = future.result()
+        except Exception as ex:
+            #drop the failed load so the object is retried when shown again
+            if (self.pending.get(index) is future):
+                del self.pending[index]
+            self.lightcurve_plot.clear()
+            self.lightcurve_plot.set_title('{} could not be loaded ({})'.format(self.objectIds[index],
+                                                                               type(ex).__name__))
+            return
+        self.lightcurve_plot.load(ztf, initial_filt=self.initial_filt, magnitude=self.magnitude)
+
+    def next(self, button=None):
+        '''Show the next object'''
+        self.show(self.index + 1)
+
+    def previous(self, button=None):
+        '''Show the previous object'''
+        self.show(self.index - 1)
+
+    def jump_change(self, change):
+        '''Show the object selected in the index box'''
+        if (change.new != self.index):
+            self.show(change.new)
+
+    def initialize_widget(self):
+        '''Setup layout of the widget'''
+        button_layout = Layout(width='15%')
+        self.previous_button = w.Button(description='Previous', layout=button_layout)
+        self.next_button = w.Button(description='Next', layout=button_layout)
+        self.jump = w.BoundedIntText(value=0, min=0, max=max(len(self.objectIds) - 1, 0),
+                                     description='Index', layout=Layout(width='25%'))
+        self.position = w.Label(value='')
+
+        self.previous_button.on_click(self.previous)
+        self.next_button.on_click(self.next)
+        self.jump.observe(self.jump_change, 'value')
+
+        self.control_box = w.HBox([self.previous_button, self.next_button, self.jump, self.position])
+        self.widget = w.VBox([self.control_box, self.lightcurve_plot.widget])
+
+    def plot(self):
+        '''plot display'''
+        display(self.widget)
@@ -0,0 +1,119 @@
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import os
+import time
+import numpy as np
+import pandas as pd
+from ztf_data import read_alerts_many, apply_zeropoints, MAGNITUDE_ERRORS
+from periodogram import best_period, frequency_grid
+
+#columns of the period files. fit_period is the rotation period in hours, as the fit_period
+#and ALCDEF period columns of the asteroid catalogs; peak_period is the periodogram peak in days
+PERIOD_COLUMNS = ['objectId', 'fit_period', 'peak_period', 'power', 'n_points']
+
+def object_period(task):
+    '''Return (objectId, rotation period, peak period, peak power, number of points) for one
+    light curve, task is (objectId, t, y, dy, bands, minimum_period, maximum_period, n_frequencies).
+    Asteroid light curves are double peaked, so the rotation period is twice the
+    period of the Lomb-Scargle peak; it is returned in hours, the peak period in days'''
+    objectId, t, y, dy, bands, minimum_period, maximum_period, n_frequencies = task
+    keep = np.isfinite(t) & np.isfinite(y) & np.isfinite(dy)
+    if (keep.sum() < 3):
+        return objectId, np.nan, np.nan, np.nan, int(keep.sum())
+    t, y, dy, bands = t[keep], y[keep], dy[keep], bands[keep]
+    frequencies = frequency_grid(t, minimum_period, maximum_period, n_frequencies=n_frequencies)
+    period, frequencies, power = best_period(t, y, dy, bands, frequencies)
+    return objectId, 2 * 24 * period, period, power.max(), len(t)
+
+def read_periods(directory):
+    '''Return the periods written to directory by compute_periods as one DataFrame'''
+    parts = []
+    for path in sorted(glob.glob(os.path.join(directory, 'part-*.npz'))):
+        with np.load(path) as part:
+            parts.append(pd.DataFrame({column: part[column] for column in PERIOD_COLUMNS}))
+    if (len(parts) == 0):
+        return pd.DataFrame({'objectId': np.array([], dtype=str), 'fit_period': np.array([]),
+                             'peak_period': np.array([]), 'power': np.array([]),
+                             'n_points': np.array([], dtype=np.int64)})
+    return pd.concat(parts, ignore_index=True)
+
+def write_periods(directory, results):
+    '''Write one part file of (objectId, fit_period, peak_period, power, n_points) results'''
+    index = len(glob.glob(os.path.join(directory, 'part-*.npz')))
+    path = os.path.join(directory, 'part-{:06d}.npz'.format(index))
+    columns = list(zip(*results))
+    #write to a temporary file so readers and restarts never see partial parts
+    tmp = os.path.join(directory, 'tmp-{:06d}.npz'.format(index))
+    np.savez(tmp, objectId=np.array(columns[0], dtype=str), fit_period=np.array(columns[1], dtype=np.float64),
+             peak_period=np.array(columns[2], dtype=np.float64), power=np.array(columns[3], dtype=np.float64),
+             n_points=np.array(columns[4], dtype=np.int64))
+    os.replace(tmp, path)
+
+def light_curve_tasks(objectIds, dbcon, photometry_cache=None, zeropoints=None, magnitude='magpsf',
+                      minimum_period=0.05, maximum_period=None, n_frequencies=None, paramstyle=None):
+    '''Read the alerts of objectIds with one batched query and return the periodogram tasks'''
+    if (photometry_cache is not None):
+        data = photometry_cache.load_many(objectIds, dbcon, paramstyle=paramstyle)
+    else:
+        data = read_alerts_many(objectIds, dbcon, paramstyle=paramstyle)
+    if (zeropoints is not None):
+        data = apply_zeropoints(data, zeropoints)
+    groups = dict(list(data.groupby('objectId', sort=False)))
+    tasks = []
+    for objectId in objectIds:
+        group = groups.get(objectId, data.iloc[:0])
+        tasks.append((objectId, group['jd'].values.astype(np.float64),
+                      group[magnitude].values.astype(np.float64),
+                      group[MAGNITUDE_ERRORS[magnitude]].values.astype(np.float64),
+                      group['fid'].values, minimum_period, maximum_period, n_frequencies))
+    return tasks
+
+def compute_periods(objectIds, dbcon, directory, workers=1, batch_size=200, photometry_cache=None,
+                    zeropoints=None, magnitude='magpsf', minimum_period=0.05, maximum_period=None,
+                    n_frequencies=None, progress=print, paramstyle=None):
+    '''Compute the rotation period of many objects from their multi-band periodogram and
+    return them as a DataFrame of PERIOD_COLUMNS.
+
+    Objects are read batch_size at a time, from photometry_cache when given, and
+    the next batch is read while workers processes compute the periods of the
+    current one. Each batch is written to its own part file in directory as soon
+    as it is done, and objects already in directory are skipped, so an
+    interrupted run continues where it stopped. Objects with fewer than three
+    alerts get NaN periods. minimum_period and maximum_period bound the peak period,
+    in days. progress is called with a status line after every batch'''
+    os.makedirs(directory, exist_ok=True)
+    done = set(read_periods(directory).objectId)
+    todo = [objectId for objectId in objectIds if objectId not in done]
+    options = {'photometry_cache': photometry_cache, 'zeropoints': zeropoints, 'magnitude': magnitude,
+               'minimum_period': minimum_period, 'maximum_period': maximum_period,
+               'n_frequencies': n_frequencies, 'paramstyle': paramstyle}
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    start = time.perf_counter()
+    n_done = 0
+    pending = None
+    try:
+        for first in range(0, len(todo) + batch_size, batch_size):
+            #read the next batch while the current one is computed
+            batch = todo[first:first+batch_size]
+            tasks = light_curve_tasks(batch, dbcon, **options) if len(batch) > 0 else []
+            if (pending is not None):
+                results = [future.result() for future in pending] if executor is not None else pending
+                if (len(results) > 0):
+                    write_periods(directory, results)
+                n_done += len(results)
+                if (progress is not None):
+                    elapsed = time.perf_counter() - start
+                    progress('{} / {} objects, {:.1f} objects/s'.format(n_done, len(todo), n_done / elapsed))
+            if (len(batch) == 0):
+                break
+            if (executor is not None):
+                pending = [executor.submit(object_period, task) for task in tasks]
+            else:
+                pending = [object_period(task) for task in tasks]
+    finally:
+        if (executor is not None):
+            #queued tasks of an interrupted run are dropped, their objects are redone on restart
+            for future in (pending or []):
+                future.cancel()
+            executor.shutdown()
+    return read_periods(directory)
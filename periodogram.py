@@ -0,0 +1,105 @@
+import numpy as np
+
+
+def frequency_grid(t, minimum_period=0.05, maximum_period=None, oversampling=5, n_frequencies=None):
+    '''Return an evenly spaced frequency grid (1/day) for times t.
+    The spacing resolves a phase drift of 1/oversampling over the baseline, or
+    n_frequencies frequencies are used when given. maximum_period defaults to the baseline'''
+    t = np.asarray(t, dtype=np.float64)
+    baseline = t.max() - t.min() if len(t) > 1 else 1.
+    if (baseline <= 0):
+        baseline = 1.
+    fmin = 1. / (maximum_period if maximum_period is not None else baseline)
+    fmax = 1. / minimum_period
+    if (n_frequencies is None):
+        n_frequencies = int(np.ceil((fmax - fmin) * oversampling * baseline)) + 1
+    return np.linspace(fmin, fmax, max(n_frequencies, 2))
+
+def lomb_scargle(t, y, dy=None, bands=None, frequencies=None, chunksize=None):
+    '''Return the Lomb-Scargle power at each frequency.
+
+    Each band has its own mean magnitude and all bands share one sinusoid, the
+    single band case is the floating mean periodogram. The power is the fraction
+    of the weighted variance around the band means explained by the sinusoid.
+    Frequencies are processed chunksize at a time, by default chunks of about
+    2**18 elements per (frequency, point) array, to bound memory. On an evenly
+    spaced grid exp(i omega t) is stepped from one frequency to the next with a
+    complex multiplication instead of evaluating sin and cos'''
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    weights = np.ones(len(t)) if dy is None else 1. / np.asarray(dy, dtype=np.float64)**2
+    keep = np.isfinite(t) & np.isfinite(y) & np.isfinite(weights)
+    t, y, weights = t[keep], y[keep], weights[keep]
+    if (frequencies is None):
+        frequencies = frequency_grid(t)
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    power = np.zeros(len(frequencies))
+    if (len(t) < 3):
+        return power
+
+    #band membership as a (points, bands) weight matrix
+    if (bands is None):
+        bands = np.zeros(len(t), dtype=np.intp)
+    else:
+        bands = np.unique(np.asarray(bands)[keep], return_inverse=True)[1].ravel()
+    n_bands = bands.max() + 1
+    members = np.zeros((len(t), n_bands))
+    members[np.arange(len(t)), bands] = weights
+    band_weights = members.sum(axis=0)
+
+    #remove the weighted mean of every band
+    y = y - (members.T @ y / band_weights)[bands]
+    chi2 = np.sum(weights * y**2)
+    if (chi2 == 0):
+        return power
+    #every sum needed is a trigonometric sum of one of these columns, sum(h exp(i omega t))
+    columns = np.column_stack([members, weights * y]).astype(np.complex128)
+
+    if (chunksize is None):
+        chunksize = max(1, 2**18 // len(t))
+    #times relative to the first point keep the phases small
+    t = t - t.min()
+    step = np.diff(frequencies)
+    regular = len(step) > 0 and np.allclose(step, step[0], rtol=1e-9, atol=0)
+    if (regular):
+        #rows are stepped one frequency at a time within a block, and blocks by block_size frequencies
+        block_size = int(np.ceil(np.sqrt(min(chunksize, len(frequencies)))))
+        rotation = np.exp(2j * np.pi * step[0] * t)
+        block_rotation = np.exp(2j * np.pi * step[0] * block_size * t)
+    for start in range(0, len(frequencies), chunksize):
+        chunk = frequencies[start:start+chunksize]
+        if (regular):
+            #exp(i omega t) of each frequency from the previous one, reseeded every chunk
+            phases = np.empty((len(chunk), len(t)), dtype=np.complex128)
+            phases[0] = np.exp(2j * np.pi * chunk[0] * t)
+            for k in range(1, min(block_size, len(chunk))):
+                np.multiply(phases[k-1], rotation, out=phases[k])
+            for first in range(block_size, len(chunk), block_size):
+                rows = min(block_size, len(chunk) - first)
+                np.multiply(phases[first-block_size:first-block_size+rows], block_rotation,
+                            out=phases[first:first+rows])
+        else:
+            phases = np.exp(2j * np.pi * chunk[:, None] * t)
+        sums = phases @ columns
+        #sum(w exp(2 i omega t)) gives the sums of sin**2, cos**2 and sin*cos
+        double = (phases * phases) @ weights
+        c_band = sums[:, :n_bands].real / band_weights
+        s_band = sums[:, :n_bands].imag / band_weights
+        cc = 0.5 * (band_weights.sum() + double.real) - (c_band * c_band) @ band_weights
+        ss = 0.5 * (band_weights.sum() - double.real) - (s_band * s_band) @ band_weights
+        sc = 0.5 * double.imag - (s_band * c_band) @ band_weights
+        yc = sums[:, n_bands].real
+        ys = sums[:, n_bands].imag
+        det = ss * cc - sc**2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            explained = (ys**2 * cc - 2 * ys * yc * sc + yc**2 * ss) / det
+        power[start:start+chunksize] = np.where(det > 0, explained / chi2, 0.)
+    return power
+
+def best_period(t, y, dy=None, bands=None, frequencies=None, chunksize=None):
+    '''Return the period of the highest periodogram peak, with the frequencies and power'''
+    t = np.asarray(t, dtype=np.float64)
+    if (frequencies is None):
+        frequencies = frequency_grid(t[np.isfinite(t)])
+    power = lomb_scargle(t, y, dy, bands, frequencies, chunksize)
+    return 1. / frequencies[np.argmax(power)], frequencies, power
@@ -0,0 +1,129 @@
+import asyncio
+import ipywidgets as w
+from ipywidgets import Layout
+import numpy as np
+
+
+class Selection_table():
+    '''Paged table of the rows selected in a Scatter_plot'''
+
+    def __init__(self, table, scatter=None, columns=None, page_size=25, delay=0.2, show=True):
+        '''Initialize table widget.
+
+        table is a pandas DataFrame whose rows line up with the points of the
+        scatter plot. Only the page_size rows of the current page and the given
+        columns are rendered, so the cost does not grow with the selection.
+        Selection changes within delay seconds of each other are rendered once
+        on the kernel's event loop; the count is updated immediately'''
+        self.table = table
+        self.columns = list(table.columns) if columns is None else list(columns)
+        self.column_positions = table.columns.get_indexer(self.columns)
+        self.page_size = page_size
+        self.delay = delay
+        self.selection = np.zeros(0, dtype=np.intp)
+        self.page = 0
+        #pending render on the event loop
+        self.render_loop = None
+        self.render_handle = None
+
+        self.initialize_widget()
+        if (scatter is not None):
+            scatter.on_select(self.set_selection)
+            self.set_selection(scatter.selection)
+
+        #plot initial widget
+        if (show == True):
+            self.plot()
+
+    def n_pages(self):
+        '''Return the number of pages of the selection'''
+        return max(1, -(-len(self.selection) // self.page_size))
+
+    def page_rows(self, page):
+        '''Return the rows of one page, only that page of the selection is listed'''
+        if (hasattr(self.selection, 'page')):
+            return self.selection.page(page, self.page_size)
+        return self.selection[page*self.page_size:(page + 1)*self.page_size]
+
+    def set_selection(self, selection):
+        '''Show a new Selection or array of rows from the first page'''
+        self.selection = selection
+        self.page = 0
+        self.count.value = '{} selected'.format(len(selection))
+        self.schedule()
+
+    def schedule(self):
+        '''Render after delay seconds unless another change arrives first. The render runs
+        on the thread of the event loop; without a running loop it runs at once'''
+        from tornado.ioloop import IOLoop
+        self.cancel_render()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.render()
+            return
+        if (self.delay <= 0):
+            self.render()
+            return
+        self.render_loop = IOLoop.current()
+        self.render_handle = self.render_loop.call_later(self.delay, self.render)
+
+    def cancel_render(self):
+        '''Drop the render queued by schedule()'''
+        if (self.render_handle is not None):
+            self.render_loop.remove_timeout(self.render_handle)
+            self.render_handle = None
+
+    def render(self):
+        '''Render the current page'''
+        self.cancel_render()
+        n_pages = self.n_pages()
+        self.page = min(self.page, n_pages - 1)
+        rows = self.page_rows(self.page)
+        if (len(rows) == 0):
+            self.html.value = ''
+        else:
+            self.html.value = self.table.iloc[rows, self.column_positions].to_html(max_rows=self.page_size)
+        self.jump.max = n_pages
+        self.jump.value = self.page + 1
+        self.position.value = ' / {}'.format(n_pages)
+
+    def show_page(self, page):
+        '''Render the given page'''
+        page = max(0, min(page, self.n_pages() - 1))
+        if (page != self.page):
+            self.page = page
+            self.render()
+
+    def next(self, button=None):
+        '''Show the next page'''
+        self.show_page(self.page + 1)
+
+    def previous(self, button=None):
+        '''Show the previous page'''
+        self.show_page(self.page - 1)
+
+    def jump_change(self, change):
+        '''Show the page typed in the page box'''
+        self.show_page(change.new - 1)
+
+    def initialize_widget(self):
+        '''Setup layout of the widget'''
+        button_layout = Layout(width='15%')
+        self.previous_button = w.Button(description='Previous', layout=button_layout)
+        self.next_button = w.Button(description='Next', layout=button_layout)
+        self.jump = w.BoundedIntText(value=1, min=1, max=1, description='Page', layout=Layout(width='25%'))
+        self.position = w.Label(value=' / 1')
+        self.count = w.Label(value='0 selected')
+        self.html = w.HTML(value='')
+
+        self.previous_button.on_click(self.previous)
+        self.next_button.on_click(self.next)
+        self.jump.observe(self.jump_change, 'value')
+
+        self.control_box = w.HBox([self.previous_button, self.next_button, self.jump, self.position, self.count])
+        self.widget = w.VBox([self.control_box, self.html])
+
+    def plot(self):
+        '''plot display'''
+        display(self.widget)
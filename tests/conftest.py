@@ -0,0 +1,159 @@
+import base64
+import builtins
+import gzip
+import io
+import sqlite3
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+#widgets are displayed without a notebook
+builtins.display = getattr(builtins, 'display', lambda *args, **kwargs: None)
+
+
+def synthetic_alerts(n_objects, n_alerts, seed=0):
+    '''Return a DataFrame of synthetic alerts with n_alerts per object'''
+    rng = np.random.default_rng(seed)
+    n = n_objects * n_alerts
+    return pd.DataFrame({
+        'pid': rng.integers(0, 10**9, n),
+        'objectId': np.repeat(['ZTF18{:07d}'.format(i) for i in range(n_objects)], n_alerts),
+        'jd': 2458300. + rng.uniform(0, 400, n),
+        'magpsf': rng.normal(18, 0.5, n),
+        'sigmapsf': rng.uniform(0.01, 0.2, n),
+        'magnr': rng.normal(19, 0.5, n),
+        'sigmagnr': rng.uniform(0.01, 0.2, n),
+        'isdiffpos': rng.choice(['t', 'f'], n),
+        'diffmaglim': rng.normal(20.5, 0.3, n),
+        'magzpsci': rng.normal(26, 0.1, n),
+        'ra': rng.uniform(0, 360, n),
+        'decl': rng.uniform(-30, 90, n),
+        'fid': rng.integers(1, 4, n),
+        'classtar': rng.uniform(0, 1, n),
+        'rb': rng.uniform(0, 1, n),
+        'candid': np.arange(n, dtype=np.int64) + 10**17,
+        'programid': rng.integers(1, 3, n),
+    })
+
+
+def alerts_db(alerts):
+    '''Return a SQLite connection holding alerts, usable from prefetch threads'''
+    dbcon = sqlite3.connect(':memory:', check_same_thread=False)
+    alerts.to_sql('alerts', dbcon, index=False)
+    return dbcon
+
+
+def synthetic_stamp(rng, shape=(63, 63)):
+    '''Return a gzipped FITS cutout with a noisy point source'''
+    from astropy.io import fits
+    y, x = np.mgrid[0:shape[0], 0:shape[1]]
+    data = rng.normal(100, 10, shape) + 500 * np.exp(-((x - shape[1] // 2)**2 + (y - shape[0] // 2)**2) / 8.)
+    output = io.BytesIO()
+    fits.PrimaryHDU(data.astype(np.float32)).writeto(output)
+    return gzip.compress(output.getvalue())
+
+
+class Result():
+    '''Stand-in for a couchbase ValueResult'''
+    def __init__(self, value):
+        self.value = value
+
+
+class MemoryBucket():
+    '''In-memory stand-in for a couchbase bucket'''
+    def __init__(self, documents, multi=True):
+        self.documents = documents
+        if (multi):
+            self.get_multi = self._get_multi
+
+    def get(self, key):
+        return Result(self.documents[key])
+
+    def _get_multi(self, keys, quiet=False):
+        return {key: Result(self.documents[key]) for key in keys if key in self.documents}
+
+
+def memory_bucket(candids, multi=True, n_unique=5, seed=0):
+    '''Return a MemoryBucket with a cutout triplet for every candid, reusing n_unique triplets'''
+    rng = np.random.default_rng(seed)
+    results = [{key: base64.b64encode(synthetic_stamp(rng)).decode('ascii')
+                for key in ['differenceImage', 'scienceImage', 'templateImage']}
+               for i in range(min(n_unique, len(candids)))]
+    documents = {'{}'.format(candid): results[i % len(results)] for i, candid in enumerate(candids)}
+    return MemoryBucket(documents, multi=multi)
+
+
+class Lightcurve():
+    '''Minimal stand-in for ZTF_lightcurve with every point in the r band'''
+    def __init__(self, n, seed=0):
+        rng = np.random.default_rng(seed)
+        self.objectId = 'synthetic'
+        self.filterDict = OrderedDict({"g":1, "r":2, "i":3})
+        self.time = np.sort(rng.uniform(58300, 58700, n))
+        self.magpsf = rng.normal(18, 0.5, n).astype(np.float32)
+        self.sigmapsf = rng.uniform(0.01, 0.2, n).astype(np.float32)
+        self.g = self.i = slice(0, 0)
+        self.r = slice(0, n)
+        self.scienceImageArray = []
+
+
+@pytest.fixture
+def make_alerts():
+    '''Factory of synthetic alert frames, make_alerts(n_objects, n_alerts)'''
+    return synthetic_alerts
+
+
+@pytest.fixture
+def make_alerts_db():
+    '''Factory of SQLite alerts tables, make_alerts_db(n_objects, n_alerts)'''
+    return lambda n_objects, n_alerts, seed=0: alerts_db(synthetic_alerts(n_objects, n_alerts, seed=seed))
+
+
+@pytest.fixture
+def make_bucket():
+    '''Factory of in-memory cutout buckets, make_bucket(candids)'''
+    return memory_bucket
+
+
+@pytest.fixture
+def make_lightcurve():
+    '''Factory of stand-in light curves, make_lightcurve(n)'''
+    return Lightcurve
+
+
+class MessageLog():
+    '''State sent by widgets as (widget class, state, buffers)'''
+    def __init__(self):
+        self.messages = []
+
+    def list_payloads(self):
+        '''Return (widget class, state key, length) of the numeric lists longer than one item sent as JSON'''
+        return [(name, key, len(value)) for name, state, buffers in self.messages
+                for key, value in state.items()
+                if (isinstance(value, (list, tuple)) and len(value) > 1
+                    and all(isinstance(item, (int, float)) or item is None for item in value))]
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    '''Record the state sent by every widget opened or updated during the test'''
+    import ipywidgets as w
+    from ipywidgets.widgets.widget import _remove_buffers
+    log = MessageLog()
+    open_ = w.Widget.open
+
+    def _send(self, msg, buffers=None):
+        log.messages.append((type(self).__name__, msg.get('state', {}), buffers or []))
+
+    def _open(self):
+        opened = self.comm is not None
+        open_(self)
+        if (not opened):
+            state, buffer_paths, buffers = _remove_buffers(self.get_state())
+            log.messages.append((type(self).__name__, state, buffers))
+
+    monkeypatch.setattr(w.Widget, '_send', _send)
+    monkeypatch.setattr(w.Widget, 'open', _open)
+    return log
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import ztf_data
+from ztf_data import PNGCache, STAMP_KEYS
+from ZTFObject import ZTF_lightcurve, CutoutStore
+
+
+def test_lazy_images_keep_workers(make_alerts_db, make_bucket):
+    dbcon = make_alerts_db(1, 20)
+    ztf = ZTF_lightcurve('ZTF180000000', dbcon)
+    bucket = make_bucket(ztf.candid)
+    ztf = ZTF_lightcurve('ZTF180000000', dbcon, image=True, couchbase=bucket, lazy=True, workers=2)
+    assert ztf.imageStore.workers == 2
+
+
+def test_fetch_all_process_pool(make_alerts_db, make_bucket):
+    dbcon = make_alerts_db(1, 30)
+    candids = ZTF_lightcurve('ZTF180000000', dbcon).candid
+    bucket = make_bucket(candids)
+    serial = CutoutStore(bucket, cache=PNGCache())
+    pooled = CutoutStore(bucket, cache=PNGCache(), workers=2)
+    serial.fetch_all(candids)
+    pooled.fetch_all(candids, chunksize=7)
+    for candid in candids:
+        for stamp in STAMP_KEYS:
+            png = pooled.cache.get(candid, stamp)
+            assert png is not None
+            assert png == serial.cache.get(candid, stamp)
+
+
+def test_process_pool_is_shared(make_alerts_db, make_bucket):
+    dbcon = make_alerts_db(2, 10)
+    first = ZTF_lightcurve('ZTF180000000', dbcon)
+    second = ZTF_lightcurve('ZTF180000001', dbcon)
+    bucket = make_bucket(list(first.candid) + list(second.candid))
+    stores = [CutoutStore(bucket, cache=PNGCache(), workers=2) for i in range(2)]
+    #the browser prefetches from a worker thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(stores[0].fetch_all, first.candid).result()
+    pool = ztf_data.process_pool(2)
+    stores[1].fetch_all(second.candid)
+    assert ztf_data.process_pool(2) is pool
+    assert all(store.cache.get(candid, 'scienceImage') is not None
+               for store, ztf in zip(stores, [first, second]) for candid in ztf.candid)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from grid_index import GridIndex, Selection
+
+
+@pytest.fixture
+def index():
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(1, 1, 20000)
+    y = x * rng.normal(1, 0.1, len(x))
+    x[:10] = np.nan
+    return GridIndex(x, y)
+
+
+@pytest.mark.parametrize('xmin, xmax', [(1., 2.), (None, 2.), (1., None), (None, None)])
+def test_interval_contains(index, xmin, xmax):
+    selection = Selection(index, 'interval', (xmin, xmax))
+    rows = np.arange(len(index.x))
+    assert np.array_equal(np.flatnonzero(selection.contains(rows)), index.interval(xmin, xmax))
+    assert len(selection) == index.count_interval(xmin, xmax)
+
+
+def test_rectangle_contains(index):
+    selection = Selection(index, 'rectangle', (1., 2., None, 3.))
+    rows = np.arange(len(index.x))
+    assert np.array_equal(np.flatnonzero(selection.contains(rows)), index.rectangle(1., 2., None, 3.))
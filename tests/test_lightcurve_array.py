@@ -0,0 +1,61 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from ztf_data import LightcurveArray, FILTER_IDS
+from ZTFObject import ZTF_lightcurve
+
+
+def shuffled_alerts(make_alerts):
+    '''Alerts of several objects in random row order, one object without i band alerts'''
+    alerts = make_alerts(6, 40)
+    alerts = alerts[~((alerts.objectId == 'ZTF180000002') & (alerts.fid == 3))]
+    return alerts.sample(frac=1., random_state=0).reset_index(drop=True)
+
+
+def test_from_many_matches_from_frame(make_alerts):
+    alerts = shuffled_alerts(make_alerts)
+    lightcurves = LightcurveArray.from_many(alerts)
+    assert list(lightcurves.keys()) == list(pd.unique(alerts.objectId))
+    base = next(iter(lightcurves.values())).records.base
+    for objectId, lc in lightcurves.items():
+        expected = LightcurveArray.from_frame(alerts[alerts.objectId == objectId])
+        assert lc.objectId == objectId
+        assert np.array_equal(lc.records, expected.records)
+        assert lc.offsets == expected.offsets
+        #every object is a view of the one record array
+        assert lc.records.base is base
+        for filt, fid in FILTER_IDS.items():
+            band = lc.band(filt)
+            assert np.all(band['fid'] == fid) and np.all(np.diff(band['jd']) >= 0)
+            assert len(band) == np.sum((alerts.objectId == objectId) & (alerts.fid == fid))
+            assert band.base is base
+    assert len(lightcurves['ZTF180000002'].band('i')) == 0
+
+
+def test_append_matches_from_frame(make_alerts):
+    alerts = make_alerts(1, 60)
+    old, new = alerts.iloc[:40], alerts.iloc[40:]
+    lc = LightcurveArray.from_frame(old)
+    appended, order = lc.append(new)
+    assert np.array_equal(appended.records, LightcurveArray.from_frame(alerts).records)
+    assert appended.offsets == LightcurveArray.from_frame(alerts).offsets
+    #order maps the new rows to the current rows followed by the added ones
+    candids = np.concatenate([lc['candid'], new.candid.values])
+    assert np.array_equal(candids[order], appended['candid'])
+
+
+def test_update_permutes_images(make_alerts, make_bucket):
+    alerts = make_alerts(1, 60).sort_values('jd').reset_index(drop=True)
+    dbcon = sqlite3.connect(':memory:')
+    alerts.iloc[:40].to_sql('alerts', dbcon, index=False)
+    bucket = make_bucket(alerts.candid)
+    ztf = ZTF_lightcurve('ZTF180000000', dbcon, image=True, couchbase=bucket, lazy=True)
+    assert ztf.update(data=alerts.iloc[40:]) == 20
+    assert len(ztf.candid) == 60
+    for images in [ztf.diffImageArray, ztf.scienceImageArray, ztf.templateImageArray]:
+        assert [image.candid for image in images] == list(ztf.candid)
+    assert [image.stamp for image in ztf.templateImageArray] == ['templateImage'] * 60
+    for filt in FILTER_IDS:
+        assert np.array_equal(ztf.time[getattr(ztf, filt)], np.sort(alerts.jd[alerts.fid == FILTER_IDS[filt]]))
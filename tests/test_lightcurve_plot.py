@@ -0,0 +1,38 @@
+import pytest
+
+from lightcurve_plot import Lightcurve_plot
+
+
+def counted(plot):
+    '''Count the pushes of plot to its marks'''
+    calls = []
+    update_marks = plot.update_marks
+    def counting(filters=None):
+        calls.append((plot.sc_x.min, plot.sc_x.max))
+        update_marks(filters)
+    plot.update_marks = counting
+    return calls
+
+
+@pytest.fixture
+def loaded_plot(make_lightcurve):
+    plot = Lightcurve_plot(show=False, max_points=1000)
+    plot.load(make_lightcurve(20000))
+    return plot
+
+
+def test_one_push_per_zoom_message(loaded_plot):
+    plot = loaded_plot
+    calls = counted(plot)
+    plot.sc_x.set_state({'min': 58400., 'max': 58500.})
+    assert calls == [(58400., 58500.)]
+
+
+def test_fold_pushes_once(loaded_plot):
+    plot = loaded_plot
+    plot.sc_x.set_state({'min': 58400., 'max': 58500.})
+    calls = counted(plot)
+    plot.period_text.value = 0.5
+    calls.clear()
+    plot.fold_button.value = True
+    assert calls == [(None, None)]
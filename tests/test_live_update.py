@@ -0,0 +1,70 @@
+import asyncio
+import sqlite3
+
+from ZTFObject import ZTF_lightcurve
+from lightcurve_plot import Lightcurve_plot
+
+
+def feed(make_alerts, n_history, n_new):
+    '''Return a default (same thread only) SQLite connection with the first n_history
+    alerts of one object and the n_new later alerts'''
+    alerts = make_alerts(1, n_history + n_new).sort_values('jd').reset_index(drop=True)
+    dbcon = sqlite3.connect(':memory:')
+    alerts.iloc[:n_history].to_sql('alerts', dbcon, index=False)
+    return dbcon, alerts.iloc[n_history:]
+
+
+def n_plotted(plot):
+    return sum(len(x) for x in plot.x.values())
+
+
+def run(coroutine):
+    asyncio.run(coroutine)
+
+
+def test_poll_adds_new_alerts(make_alerts):
+    dbcon, new = feed(make_alerts, 50, 5)
+    ztf = ZTF_lightcurve(new.objectId.iloc[0], dbcon)
+    plot = Lightcurve_plot(show=False)
+    plot.load(ztf)
+
+    async def session():
+        plot.poll(ztf, interval=0.01)
+        new.to_sql('alerts', dbcon, index=False, if_exists='append')
+        await asyncio.sleep(0.1)
+        plot.stop_polling()
+    run(session())
+    assert n_plotted(plot) == 55
+    assert len(ztf.candid) == 55
+
+
+def test_poll_stops_after_failure(capsys, make_alerts):
+    dbcon, new = feed(make_alerts, 50, 5)
+    ztf = ZTF_lightcurve(new.objectId.iloc[0], dbcon)
+    plot = Lightcurve_plot(show=False)
+    plot.load(ztf)
+
+    async def session():
+        plot.poll(ztf, interval=0.01)
+        dbcon.close()
+        await asyncio.sleep(0.1)
+    run(session())
+    assert plot.polled is None and plot.poll_handle is None
+    assert capsys.readouterr().out.count('Polling') == 1
+
+
+def test_load_stops_polling_of_previous_object(make_alerts):
+    dbcon, new = feed(make_alerts, 50, 5)
+    ztf = ZTF_lightcurve(new.objectId.iloc[0], dbcon)
+    other = ZTF_lightcurve(new.objectId.iloc[0], dbcon)
+    plot = Lightcurve_plot(show=False)
+    plot.load(ztf)
+
+    async def session():
+        plot.poll(ztf, interval=0.01)
+        plot.load(other)
+        new.to_sql('alerts', dbcon, index=False, if_exists='append')
+        await asyncio.sleep(0.1)
+    run(session())
+    assert n_plotted(plot) == 50
+    assert len(ztf.candid) == 50
@@ -0,0 +1,27 @@
+import sqlite3
+
+from object_browser import Object_browser
+
+
+def test_failed_load_is_retried(make_alerts_db, monkeypatch):
+    dbcon = make_alerts_db(3, 20)
+    objectIds = ['ZTF18{:07d}'.format(i) for i in range(3)]
+    load_object = Object_browser.load_object
+    failures = []
+
+    def flaky(self, objectId):
+        if (objectId == objectIds[0] and not failures):
+            failures.append(objectId)
+            raise sqlite3.OperationalError('database is locked')
+        return load_object(self, objectId)
+
+    monkeypatch.setattr(Object_browser, 'load_object', flaky)
+    browser = Object_browser(objectIds, dbcon, prefetch=1)
+    assert 'could not be loaded' in browser.lightcurve_plot.title.value
+    assert 0 not in browser.pending
+    browser.next()
+    browser.previous()
+    assert failures == [objectIds[0]]
+    assert browser.pending[0].result().objectId == objectIds[0]
+    assert 'could not be loaded' not in browser.lightcurve_plot.title.value
+
@@ -0,0 +1,40 @@
+import sqlite3
+
+import numpy as np
+
+from period_pipeline import compute_periods, read_periods, PERIOD_COLUMNS
+
+#rotation periods in hours of the synthetic asteroids
+ROTATION_HOURS = [9.6, 15.3]
+
+
+def asteroid_db(make_alerts):
+    '''Alerts of double-peaked light curves, two minima per rotation, with band offsets'''
+    alerts = make_alerts(len(ROTATION_HOURS), 300)
+    rng = np.random.default_rng(1)
+    for i, hours in enumerate(ROTATION_HOURS):
+        rows = alerts.objectId == 'ZTF18{:07d}'.format(i)
+        t = alerts.jd[rows].values
+        phase = 2 * np.pi * t / (hours / 24.)
+        alerts.loc[rows, 'magpsf'] = (18 + 0.2 * (alerts.fid[rows].values - 2) + 0.3 * np.cos(2 * phase)
+                                      + 0.05 * np.cos(phase) + rng.normal(0, 0.02, len(t)))
+        alerts.loc[rows, 'sigmapsf'] = 0.02
+    dbcon = sqlite3.connect(':memory:')
+    alerts.to_sql('alerts', dbcon, index=False)
+    return dbcon
+
+
+def test_rotation_period(tmp_path, make_alerts):
+    dbcon = asteroid_db(make_alerts)
+    objectIds = ['ZTF18{:07d}'.format(i) for i in range(len(ROTATION_HOURS))] + ['ZTF18missing']
+    periods = compute_periods(objectIds, dbcon, str(tmp_path), batch_size=2, minimum_period=0.1,
+                              progress=None).set_index('objectId')
+    assert list(periods.columns) == PERIOD_COLUMNS[1:]
+    for objectId, hours in zip(objectIds, ROTATION_HOURS):
+        assert abs(periods.fit_period[objectId] - hours) < 0.01
+        assert abs(periods.peak_period[objectId] - hours / 48.) < 1e-3
+    assert periods.loc['ZTF18missing'][['fit_period', 'peak_period', 'power']].isnull().all()
+    assert periods.n_points['ZTF18missing'] == 0
+    #a second run finds every object done
+    assert len(compute_periods(objectIds, dbcon, str(tmp_path), progress=None)) == 3
+    assert len(read_periods(str(tmp_path))) == 3
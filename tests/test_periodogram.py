@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from periodogram import lomb_scargle, frequency_grid, best_period
+
+timeseries = pytest.importorskip('astropy.timeseries')
+
+
+def make_lightcurve(n=300, period=0.37, seed=0):
+    '''Return times, magnitudes, errors and bands of a sinusoidal light curve in three bands'''
+    rng = np.random.default_rng(seed)
+    t = np.sort(rng.uniform(58300, 58700, n))
+    bands = rng.integers(0, 3, n)
+    y = 18 + np.array([0., 0.4, -0.2])[bands] + 0.3 * np.sin(2 * np.pi * t / period) + rng.normal(0, 0.05, n)
+    return t, y, rng.uniform(0.03, 0.1, n), bands
+
+
+def grids(t):
+    '''A regular grid long enough to be stepped over many blocks, and an irregular one'''
+    regular = frequency_grid(t, n_frequencies=20000)
+    irregular = np.sort(np.random.default_rng(1).uniform(regular[0], regular[-1], 2000))
+    return {'regular': regular, 'irregular': irregular}
+
+
+@pytest.mark.parametrize('grid', ['regular', 'irregular'])
+@pytest.mark.parametrize('chunksize', [None, 777])
+def test_single_band_matches_astropy(grid, chunksize):
+    t, y, dy, bands = make_lightcurve()
+    frequencies = grids(t)[grid]
+    power = lomb_scargle(t, y, dy, frequencies=frequencies, chunksize=chunksize)
+    expected = timeseries.LombScargle(t, y, dy).power(frequencies, method='cython')
+    #astropy's own 'slow' and 'cython' methods differ by about 4e-11 on these times
+    assert np.max(np.abs(power - expected)) < 1e-10
+
+
+@pytest.mark.parametrize('grid', ['regular', 'irregular'])
+def test_bands_match_astropy(grid):
+    t, y, dy, bands = make_lightcurve()
+    frequencies = grids(t)[grid]
+    power = lomb_scargle(t, y, dy, bands, frequencies, chunksize=777)
+    expected = timeseries.LombScargleMultiband(t, y, bands, dy, nterms_base=1,
+                                               nterms_band=0).power(frequencies)
+    assert np.max(np.abs(power - expected)) < 1e-7
+
+
+def test_best_period():
+    t, y, dy, bands = make_lightcurve(period=0.37)
+    period, frequencies, power = best_period(t, y, dy, bands)
+    assert abs(period - 0.37) < 1e-3
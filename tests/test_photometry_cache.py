@@ -0,0 +1,33 @@
+import sqlite3
+
+import numpy as np
+
+from ztf_data import PhotometryCache, read_alerts_many
+
+
+def test_cached_matches_database(tmp_path, make_alerts_db):
+    dbcon = make_alerts_db(3, 10)
+    objectIds = ['ZTF18{:07d}'.format(i) for i in range(3)]
+    cache = PhotometryCache(str(tmp_path))
+    first = cache.load_many(objectIds, dbcon)
+    second = cache.load_many(objectIds, dbcon)
+    assert cache.stats()['hits'] == 3
+    assert np.array_equal(first.candid.values, second.candid.values)
+    assert np.array_equal(second.candid.values, read_alerts_many(objectIds, dbcon).candid.values)
+
+
+def test_null_integer_is_not_cached(tmp_path, make_alerts):
+    alerts = make_alerts(2, 10)
+    alerts['programid'] = alerts['programid'].astype(object)
+    alerts.loc[alerts.objectId == 'ZTF180000001', 'programid'] = None
+    dbcon = sqlite3.connect(':memory:')
+    alerts.to_sql('alerts', dbcon, index=False)
+    objectIds = ['ZTF180000000', 'ZTF180000001']
+    cache = PhotometryCache(str(tmp_path))
+    for i in range(2):
+        data = cache.load_many(objectIds, dbcon)
+        assert list(data.objectId.unique()) == objectIds
+        nulls = data[data.objectId == 'ZTF180000001'].programid
+        assert nulls.isnull().all()
+    assert cache.read('ZTF180000000') is not None
+    assert cache.read('ZTF180000001') is None
@@ -0,0 +1,86 @@
+import os
+
+import ztf_data
+from ztf_data import PNGCache, STAMP_KEYS, set_png_cache
+from ZTFObject import ZTF_lightcurve, CutoutStore
+import ZTFObject
+
+
+def test_set_png_cache(make_alerts_db, make_bucket):
+    previous = ztf_data.png_cache
+    cache = PNGCache()
+    try:
+        assert set_png_cache(cache) is cache
+        assert not hasattr(ZTFObject, 'png_cache')
+        dbcon = make_alerts_db(1, 5)
+        candids = ZTF_lightcurve('ZTF180000000', dbcon).candid
+        store = CutoutStore(make_bucket(candids))
+        assert store.cache is cache
+        ztf_data.fetch_png(store.bucket, ['{}'.format(candids[0])])
+        assert cache.get(candids[0], STAMP_KEYS[0]) is not None
+    finally:
+        set_png_cache(previous)
+
+
+def png(i, size=100):
+    return bytes([i % 256]) * size
+
+
+def test_byte_bound_and_lru_order():
+    cache = PNGCache(maxbytes=350)
+    for i in range(3):
+        cache.put(i, 'scienceImage', png(i))
+    assert cache.stats()['nbytes'] == 300
+    #reading 0 makes 1 the least recently used
+    assert cache.get(0, 'scienceImage') == png(0)
+    cache.put(3, 'scienceImage', png(3))
+    assert cache.stats()['nbytes'] == 300 and cache.stats()['evictions'] == 1
+    assert cache.get(1, 'scienceImage') is None
+    assert [cache.get(i, 'scienceImage') for i in [0, 2, 3]] == [png(0), png(2), png(3)]
+    #replacing an entry counts its new size only
+    cache.put(2, 'scienceImage', png(2, 50))
+    assert cache.stats()['nbytes'] == 250
+    #an entry larger than the bound is not kept
+    cache.put(4, 'scienceImage', png(4, 400))
+    assert cache.stats()['nbytes'] <= 350
+    assert cache.get(4, 'scienceImage') is None
+
+
+def test_modes_are_separate_entries():
+    cache = PNGCache()
+    cache.put(1, 'scienceImage', png(1), mode='equalize')
+    assert cache.get(1, 'scienceImage', mode='zscale') is None
+    assert cache.get(1, 'scienceImage', mode='equalize') == png(1)
+
+
+def test_disk_tier(tmp_path):
+    cache = PNGCache(maxbytes=250, directory=str(tmp_path))
+    for i in range(3):
+        cache.put_stamps(i, [png(i), png(i + 10), png(i + 20)])
+    assert cache.stats()['entries'] == 2
+    assert not cache.has_stamps(0)
+    #evicted cutouts are read back from disk and kept in memory again
+    assert cache.get_stamps(0) == [png(0), png(10), png(20)]
+    assert cache.stats()['disk_hits'] == 3
+    assert cache.get(0, 'templateImage') == png(20)
+    assert cache.stats()['hits'] == 1
+    #a new cache on the same directory serves every cutout
+    fresh = PNGCache(directory=str(tmp_path))
+    assert all(fresh.get_stamps(i) is not None for i in range(3))
+    assert fresh.stats()['disk_hits'] == 9 and fresh.stats()['misses'] == 0
+    assert not any(name.endswith('.tmp') for name in os.listdir(str(tmp_path)))
+
+
+def test_counters():
+    cache = PNGCache(maxbytes=150)
+    assert cache.get(1, 'scienceImage') is None
+    cache.put(1, 'scienceImage', png(1))
+    cache.get(1, 'scienceImage')
+    cache.get(1, 'scienceImage')
+    cache.put(2, 'scienceImage', png(2))
+    assert cache.has_stamps(2) == False
+    assert cache.stats() == {'hits': 2, 'disk_hits': 0, 'misses': 1, 'evictions': 1, 'entries': 1,
+                             'nbytes': 100}
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'entries': 0,
+                             'nbytes': 0}
@@ -0,0 +1,57 @@
+import numpy as np
+
+from Scatter_plot import Scatter_plot
+
+
+def counted(plot):
+    '''Count the resamples of plot'''
+    calls = []
+    update = plot.update
+    def counting():
+        calls.append(plot.window())
+        update()
+    plot.update = counting
+    return calls
+
+
+def points(n=100000):
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(1, 1, n)
+    return x, x * rng.normal(1, 0.1, n)
+
+
+def test_one_resample_per_scale_message():
+    plot = Scatter_plot(*points(), show=False)
+    calls = counted(plot)
+    plot.sc_x.set_state({'min': 1., 'max': 2.})
+    plot.sc_y.set_state({'min': 1., 'max': 2.})
+    assert calls == [(1., 2., None, None), (1., 2., 1., 2.)]
+
+
+def test_set_window_resamples_once():
+    plot = Scatter_plot(*points(), show=False)
+    calls = counted(plot)
+    plot.set_window(1., 1.5, 1., 1.5)
+    assert calls == [(1., 1.5, 1., 1.5)]
+    assert plot.shown_window == (1., 1.5, 1., 1.5)
+
+
+def test_resample_keeps_selection_with_lasso():
+    plot = Scatter_plot(*points(), max_points=1000, mode='points', show=False)
+    notified = []
+    plot.on_select(notified.append)
+    plot.select_rectangle(1., 3., 1., 3.)
+    selection = plot.selection
+    plot.figure.interaction = plot.lasso
+    plot.set_window(0.5, 4., 0.5, 4.)
+    assert plot.selection is selection
+    assert notified == [selection]
+    assert len(plot.scatter.selected) > 0
+
+
+def test_lasso_selects_shown_points():
+    plot = Scatter_plot(*points(), max_points=1000, mode='points', show=False)
+    plot.figure.interaction = plot.lasso
+    plot.scatter.selected = np.array([0, 2], dtype=np.int32)
+    assert plot.selection.kind == 'rows'
+    assert np.array_equal(plot.selected, np.sort(plot.shown[[0, 2]]))
@@ -0,0 +1,55 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from selection_table import Selection_table
+
+
+def make_table(n=100):
+    return pd.DataFrame({'objectId': ['ZTF18{:07d}'.format(i) for i in range(n)], 'period': np.arange(n) / 10.})
+
+
+def test_paging():
+    table = Selection_table(make_table(), page_size=10, show=False)
+    table.set_selection(np.arange(5, 40))
+    assert table.count.value == '35 selected'
+    assert table.position.value == ' / 4'
+    assert table.html.value.count('<tr>') == 10
+    table.next()
+    table.next()
+    assert table.page == 2 and table.jump.value == 3
+    assert 'ZTF180000025' in table.html.value and 'ZTF180000024' not in table.html.value
+    table.jump.value = 4
+    assert table.html.value.count('<tr>') == 5
+    table.next()
+    assert table.page == 3
+    table.previous()
+    assert table.page == 2
+    #a new selection starts from the first page
+    table.set_selection(np.arange(3))
+    assert table.page == 0 and table.position.value == ' / 1'
+    table.set_selection(np.zeros(0, dtype=np.intp))
+    assert table.html.value == ''
+
+
+def test_debounce():
+    table = Selection_table(make_table(), page_size=10, delay=0.05, show=False)
+    renders = []
+    render = table.render
+    table.render = lambda: (renders.append(len(table.selection)), render())
+
+    async def session():
+        for n in [5, 20, 30]:
+            table.set_selection(np.arange(n))
+            assert table.count.value == '{} selected'.format(n)
+        assert renders == []
+        await asyncio.sleep(0.15)
+        assert renders == [30]
+        #a change before the delay cancels the queued render
+        table.set_selection(np.arange(2))
+        table.render()
+        await asyncio.sleep(0.15)
+    asyncio.run(session())
+    assert renders == [30, 2]
+    assert table.position.value == ' / 1'
@@ -0,0 +1,63 @@
+import sqlite3
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+from ztf_data import sql_placeholder, read_max_jd
+
+
+def driver_connection(monkeypatch, paramstyle):
+    '''Return a connection of a stand-in driver laid out like mysql.connector, whose
+    connection class lives in a submodule without paramstyle'''
+    package = types.ModuleType('fakedb')
+    connector = types.ModuleType('fakedb.connector')
+    connector.paramstyle = paramstyle
+    cext = types.ModuleType('fakedb.connector.connection_cext')
+    Connection = type('Connection', (), {'__module__': 'fakedb.connector.connection_cext'})
+    for module in [package, connector, cext]:
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+    return Connection()
+
+
+def test_sqlite_qmark():
+    assert sql_placeholder(sqlite3.connect(':memory:')) == '?'
+
+
+def test_pyformat_from_parent_module(monkeypatch):
+    assert sql_placeholder(driver_connection(monkeypatch, 'pyformat')) == '%s'
+
+
+def test_format_from_parent_module(monkeypatch):
+    assert sql_placeholder(driver_connection(monkeypatch, 'format')) == '%s'
+
+
+def test_override():
+    assert sql_placeholder(object(), paramstyle='format') == '%s'
+    assert sql_placeholder(sqlite3.connect(':memory:'), paramstyle='pyformat') == '%s'
+
+
+def test_dialect_paramstyle():
+    #SQLAlchemy connectables expose the driver's paramstyle on their dialect
+    engine = types.SimpleNamespace(dialect=types.SimpleNamespace(paramstyle='pyformat'))
+    assert sql_placeholder(engine) == '%s'
+
+
+def test_unknown_module_raises():
+    with pytest.raises(ValueError, match='paramstyle='):
+        sql_placeholder(object())
+
+
+@pytest.mark.parametrize('paramstyle', ['named', 'numeric'])
+def test_unsupported_paramstyle_raises(monkeypatch, paramstyle):
+    with pytest.raises(ValueError, match=paramstyle):
+        sql_placeholder(driver_connection(monkeypatch, paramstyle))
+    with pytest.raises(ValueError, match=paramstyle):
+        read_max_jd(['a'], sqlite3.connect(':memory:'), paramstyle=paramstyle)
+
+
+def test_queries_on_sqlite():
+    dbcon = sqlite3.connect(':memory:')
+    pd.DataFrame({'objectId': ['a', 'a', 'b'], 'jd': [1., 2., 3.]}).to_sql('alerts', dbcon, index=False)
+    assert read_max_jd(['a', 'b', 'c'], dbcon) == {'a': 2., 'b': 3.}
@@ -0,0 +1,47 @@
+import gzip
+import io
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from ztf_data import stamp_data, stamp_png
+
+
+def gzipped(hdul):
+    output = io.BytesIO()
+    hdul.writeto(output)
+    return gzip.compress(output.getvalue())
+
+
+def astropy_data(image):
+    with fits.open(io.BytesIO(gzip.decompress(image))) as hdul:
+        return hdul[0].data
+
+
+@pytest.mark.parametrize('dtype', ['uint8', 'int16', 'int32', 'int64', 'float32', 'float64'])
+def test_bitpix(dtype):
+    data = (np.arange(63*63).reshape(63, 63) % 200).astype(dtype)
+    image = gzipped(fits.HDUList([fits.PrimaryHDU(data)]))
+    assert np.array_equal(stamp_data(image), data)
+    assert np.array_equal(stamp_data(image), astropy_data(image))
+
+
+def test_bscale_bzero():
+    hdu = fits.PrimaryHDU((np.arange(100).reshape(10, 10)).astype(np.int16))
+    hdu.header['BSCALE'] = 0.5
+    hdu.header['BZERO'] = 100.
+    image = gzipped(fits.HDUList([hdu]))
+    assert np.allclose(stamp_data(image), astropy_data(image))
+    assert np.allclose(stamp_data(image), 0.5 * np.arange(100).reshape(10, 10) + 100.)
+
+
+def test_empty_primary():
+    image = gzipped(fits.HDUList([fits.PrimaryHDU(), fits.ImageHDU(np.ones((5, 5), dtype=np.float32))]))
+    assert stamp_data(image) is None
+
+
+def test_png():
+    data = np.random.default_rng(0).normal(size=(63, 63)).astype(np.float32)
+    png = stamp_png(gzipped(fits.HDUList([fits.PrimaryHDU(data)])))
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
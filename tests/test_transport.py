@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from lightcurve_plot import Lightcurve_plot
+from Scatter_plot import Scatter_plot
+
+
+@pytest.mark.parametrize('mode', ['ohlc', 'lines'])
+def test_lightcurve_sends_arrays(messages, make_lightcurve, mode):
+    plot = Lightcurve_plot(show=False, errorbar_mode=mode)
+    plot.load(make_lightcurve(2000))
+    plot.fold_button.value = True
+    plot.period_text.value = 0.5
+    plot.fold_button.value = False
+    plot.filter_items[0].value = True
+    assert len(messages.messages) > 0
+    if (mode == 'ohlc'):
+        #bqplot takes OHLC opacities only as a list
+        assert all(key == 'opacities' for name, key, length in messages.list_payloads())
+    else:
+        assert messages.list_payloads() == []
+
+
+@pytest.mark.parametrize('mode', ['points', 'density'])
+def test_scatter_sends_arrays(messages, mode):
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(1, 1, 20000)
+    y = x * rng.normal(1, 0.1, len(x))
+    plot = Scatter_plot(x, y, mode=mode, max_points=len(x), show=False)
+    plot.set_window(1., 1.5, 1., 1.5)
+    plot.select_rectangle(1., 1.2, 1., 1.2)
+    assert len(messages.messages) > 0
+    assert messages.list_payloads() == []
+
+
+def test_fold_sends_only_errorbar_times(messages, make_lightcurve):
+    plot = Lightcurve_plot(show=False, errorbar_mode='lines')
+    plot.load(make_lightcurve(2000))
+    del messages.messages[:]
+    plot.fold_button.value = True
+    sent = [sorted(state) for name, state, buffers in messages.messages if name == 'Lines']
+    assert sent == [['x']]
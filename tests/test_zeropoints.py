@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from ztf_data import ZeropointTable, apply_zeropoints
+from ZTFObject import ZTF_lightcurve
+
+DC_COLUMNS = ['pabszp', 'pabszpunc', 'dc_flux', 'dc_sigflux', 'dc_mag', 'dc_sigmag']
+
+
+def zeropoint_table(pid, missing=0.2, seed=0):
+    '''Zeropoints for a fraction 1 - missing of the unique pids'''
+    rng = np.random.default_rng(seed)
+    pid = np.unique(pid)
+    pid = pid[rng.uniform(size=len(pid)) >= missing]
+    return pd.DataFrame({'pid': rng.permutation(pid), 'pabszp': rng.normal(26, 0.1, len(pid)),
+                         'pabszpunc': rng.uniform(0.001, 0.01, len(pid))})
+
+
+def test_matches_apply_zeropoint(make_alerts):
+    alerts = make_alerts(20, 30)
+    #rows with a negative DC flux, whose magnitude is NaN
+    alerts.loc[::7, 'magpsf'] = alerts.loc[::7, 'magnr'] - 1.
+    alerts.loc[::7, 'isdiffpos'] = 'f'
+    zp_table = zeropoint_table(alerts.pid)
+    result = apply_zeropoints(alerts, ZeropointTable(zp_table))
+    assert np.array_equal(result.candid.values, alerts.candid.values)
+
+    with np.errstate(invalid='ignore'):
+        expected = ZTF_lightcurve.apply_zeropoint(None, zp_table, alerts).set_index('candid')
+    has_zeropoint = result.pid.isin(zp_table.pid).values
+    assert has_zeropoint.sum() == len(expected) and (~has_zeropoint).sum() > 0
+    assert result.dc_mag[has_zeropoint].isnull().sum() > 0
+    matched = result[has_zeropoint].set_index('candid').loc[expected.index]
+    for column in DC_COLUMNS:
+        assert np.allclose(matched[column], expected[column], rtol=1e-12, atol=0, equal_nan=True), column
+
+
+def test_nan_without_zeropoint(make_alerts):
+    alerts = make_alerts(2, 10)
+    result = apply_zeropoints(alerts, ZeropointTable(zeropoint_table(alerts.pid[:5], missing=0.)))
+    assert result[DC_COLUMNS].iloc[5:].isnull().all().all()
+    assert result[['pabszp', 'pabszpunc', 'dc_flux']].iloc[:5].notnull().all().all()
+    empty = apply_zeropoints(alerts, ZeropointTable(zeropoint_table(alerts.pid[:0])))
+    assert empty[DC_COLUMNS].isnull().all().all()
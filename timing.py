@@ -0,0 +1,87 @@
+import threading
+import time
+import pandas as pd
+
+
+class Stage():
+    '''Times a with block and records it in a StageTimer, nbytes and count can be set inside the block'''
+    __slots__ = ['timer', 'name', 'nbytes', 'count', 'label', 'start']
+
+    def __init__(self, timer, name, nbytes=0, count=1, label=None):
+        self.timer = timer
+        self.name = name
+        self.nbytes = nbytes
+        self.count = count
+        self.label = label
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.add(self.name, time.perf_counter() - self.start, self.nbytes, self.count, self.label)
+        return False
+
+class NullStage():
+    '''Stage used while the timer is disabled, records nothing'''
+    nbytes = 0
+    count = 0
+
+    def __setattr__(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_STAGE = NullStage()
+
+class StageTimer():
+    '''Wall time, bytes and item count of the named stages of loading and plotting.
+
+    Nothing is recorded until enable() is called. Stages that run in worker
+    processes are recorded by the timer of that process, not this one'''
+    def __init__(self):
+        self.enabled = False
+        self.records = []
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self.lock:
+            self.records = []
+
+    def add(self, name, seconds, nbytes=0, count=1, label=None):
+        '''Record one stage'''
+        with self.lock:
+            self.records.append((name, label, seconds, nbytes, count))
+
+    def stage(self, name, nbytes=0, count=1, label=None):
+        '''Return a context manager timing a stage, it does nothing while the timer is disabled'''
+        if (self.enabled == False):
+            return NULL_STAGE
+        return Stage(self, name, nbytes, count, label)
+
+    def frame(self):
+        '''Return every recorded stage as a DataFrame'''
+        with self.lock:
+            records = list(self.records)
+        return pd.DataFrame(records, columns=['stage', 'label', 'seconds', 'bytes', 'count'])
+
+    def summary(self):
+        '''Return calls, total and mean time, bytes and counts per stage, slowest stage first'''
+        frame = self.frame()
+        summary = frame.groupby('stage').agg(calls=('seconds', 'size'), seconds=('seconds', 'sum'),
+                                             bytes=('bytes', 'sum'), count=('count', 'sum'))
+        summary['mean_ms'] = 1e3 * summary['seconds'] / summary['calls']
+        return summary.sort_values('seconds', ascending=False)
+
+#timer shared by the data and plotting modules, call timer.enable() to record stages
+timer = StageTimer()
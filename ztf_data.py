@@ -0,0 +1,635 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import threading
+import gzip
+import io
+import os
+import sys
+import base64
+import numpy as np
+import pandas as pd
+from timing import timer
+
+#headless half of ZTFObject: alert queries, photometry, zeropoints and cutout decoding.
+#Nothing here imports ipywidgets, astropy and PIL are imported on the first image decode
+
+# use hbase to encode byte strings from kafka as base64 endoded strings
+def encodeImage(buffer):
+    '''Encode a byte array as base64 string'''
+    return base64.b64encode(buffer).decode('ascii')
+    
+def decodeImage(string):
+    '''Decode a string array into byte array using base64'''
+    return base64.b64decode(string)
+
+def blank_png():
+    '''Generate PNG bytes for a placeholder image'''
+    from PIL import Image
+    output = io.BytesIO()
+    
+    im = 10.*np.random.rand(15,15)
+    im = Image.fromarray(im)
+    im = im.convert('RGB')
+    #save as btye array
+    im.save(output, format='PNG')
+    return output.getvalue()
+
+def equalize(im):
+    '''Histogram equalize a PIL image using the luminance histogram'''
+    h = np.asarray(im.convert("L").histogram(), dtype=np.float64)
+    # step size
+    step = h.sum() / 255
+    # create equalization lookup table from the cumulative counts below each level
+    lut = (np.cumsum(h) - h) / step
+    # map image through lookup table
+    return im.point(list(lut) * len(im.getbands()))
+
+#stretch modes supported by stretch()
+STRETCH_MODES = ['equalize', 'zscale', 'asinh', 'percentile']
+
+def stretch(data, mode='equalize', percentile=(0.5, 99.5), asinh_a=0.1):
+    '''Scale cutout data to a uint8 array in one vectorized pass, NaN pixels are set to 0.
+
+    mode is one of STRETCH_MODES: histogram equalization over 256 levels, zscale
+    or percentile limits with a linear stretch, or an asinh stretch of the full range'''
+    with timer.stage('stretch', nbytes=np.asarray(data).nbytes):
+        data = np.asarray(data)
+        finite = np.isfinite(data)
+        output = np.zeros(data.shape, dtype=np.uint8)
+        values = data[finite].astype(np.float64)
+        if (values.size == 0):
+            return output
+
+        if (mode == 'equalize'):
+            vmin, vmax = values.min(), values.max()
+        elif (mode == 'zscale'):
+            from astropy.visualization import ZScaleInterval
+            vmin, vmax = ZScaleInterval().get_limits(values)
+        elif (mode == 'percentile'):
+            vmin, vmax = np.percentile(values, percentile)
+        elif (mode == 'asinh'):
+            vmin, vmax = values.min(), values.max()
+        else:
+            raise ValueError('Unknown stretch mode {}, expected one of {}'.format(mode, STRETCH_MODES))
+
+        if (vmax > vmin):
+            scaled = np.clip((values - vmin) / (vmax - vmin), 0., 1.)
+        else:
+            scaled = np.zeros_like(values)
+
+        if (mode == 'equalize'):
+            #quantize to 256 levels and map through the cumulative histogram
+            levels = (scaled * 255.).astype(np.intp)
+            h = np.bincount(levels, minlength=256)
+            lut = (np.cumsum(h) - h) * (255. / values.size)
+            output[finite] = lut[levels]
+        else:
+            if (mode == 'asinh'):
+                scaled = np.arcsinh(scaled / asinh_a) / np.arcsinh(1. / asinh_a)
+            output[finite] = np.round(scaled * 255.)
+        return output
+
+#keys of the cutouts in a couchbase return, in display order
+STAMP_KEYS = ['differenceImage', 'scienceImage', 'templateImage']
+
+def stamp_data(image):
+    '''Decompress a gzipped FITS cutout and return its image data'''
+    with timer.stage('decode', nbytes=len(image)):
+        from astropy.io import fits
+        #one decompression straight into the FITS reader
+        with fits.open(io.BytesIO(gzip.decompress(image))) as hdul:
+            data = hdul[0].data
+    return data
+
+def stamp_png(image, mode='equalize', image_format='png'):
+    '''Convert a gzipped FITS cutout to PNG bytes (or any other image_format PIL can write)
+    using the given stretch mode'''
+    from PIL import Image
+    pixels = stretch(stamp_data(image), mode=mode)
+    with timer.stage('png_encode') as stage:
+        output = io.BytesIO()
+        Image.fromarray(pixels).save(output, format=image_format)
+        stage.nbytes = output.tell()
+    return output.getvalue()
+
+def convert_stamps(triplets, mode='equalize', image_format='png'):
+    '''Convert a list of [difference, science, template] gzipped FITS cutouts to image bytes,
+    None for triplets that fail to decode. Only bytes go in and out so batches can be
+    submitted to a process pool'''
+    pngs = []
+    for triplet in triplets:
+        try:
+            pngs.append([stamp_png(image, mode=mode, image_format=image_format) for image in triplet])
+        except Exception:
+            pngs.append(None)
+    return pngs
+
+def stamp_triplet(result):
+    '''Return the difference, science and template cutouts of a couchbase return as bytes'''
+    return [decodeImage(result[key]) for key in STAMP_KEYS]
+
+def create_png(result, mode='equalize'):
+    '''Generate difference, science and template PNG bytes from couchbase return'''
+    return [stamp_png(image, mode=mode) for image in stamp_triplet(result)]
+
+def fetch_results(bucket, keys):
+    '''Get couchbase values for keys, using a multi-get when the bucket supports it.
+    Missing or failed keys return None'''
+    with timer.stage('image_get', count=len(keys)) as stage:
+        values = None
+        if (hasattr(bucket, 'get_multi')):
+            try:
+                results = bucket.get_multi(keys, quiet=True)
+                values = [getattr(results.get(key), 'value', None) for key in keys]
+            except Exception:
+                pass
+        if (values is None):
+            values = []
+            for key in keys:
+                try:
+                    values.append(bucket.get(key).value)
+                except Exception:
+                    values.append(None)
+        if (timer.enabled):
+            stage.nbytes = sum(len(value.get(key, '')) for value in values if isinstance(value, dict)
+                               for key in STAMP_KEYS)
+    return values
+
+class PNGCache():
+    '''LRU cache of decoded PNG cutouts keyed by candid, stamp type and stretch mode.
+
+    The memory tier holds at most maxbytes of PNG data. When directory is set,
+    cutouts are also written there and read back after they leave memory'''
+    def __init__(self, maxbytes=64*2**20, directory=None):
+        self.maxbytes = maxbytes
+        self.directory = directory
+        self.data = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if (directory is not None):
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, '{}_{}_{}.png'.format(*key))
+
+    def get(self, candid, stamp, mode='equalize'):
+        '''Return the PNG bytes for a stamp, None if not cached'''
+        key = ('{}'.format(candid), stamp, mode)
+        with self.lock:
+            if (key in self.data):
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+        if (self.directory is not None and os.path.exists(self.path(key))):
+            with open(self.path(key), 'rb') as f:
+                png = f.read()
+            with self.lock:
+                self.disk_hits += 1
+                self.insert(key, png)
+            return png
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, candid, stamp, png, mode='equalize'):
+        '''Add the PNG bytes for a stamp'''
+        key = ('{}'.format(candid), stamp, mode)
+        with self.lock:
+            self.insert(key, png)
+        if (self.directory is not None):
+            #write to a temporary file so readers never see partial cutouts
+            tmp = '{}.{}.tmp'.format(self.path(key), threading.get_ident())
+            with open(tmp, 'wb') as f:
+                f.write(png)
+            os.replace(tmp, self.path(key))
+
+    def insert(self, key, png):
+        '''Insert into the memory tier and evict least recently used cutouts, lock must be held'''
+        if (key in self.data):
+            self.nbytes -= len(self.data.pop(key))
+        self.data[key] = png
+        self.nbytes += len(png)
+        while (self.nbytes > self.maxbytes and len(self.data) > 0):
+            self.nbytes -= len(self.data.popitem(last=False)[1])
+            self.evictions += 1
+
+    def get_stamps(self, candid, mode='equalize'):
+        '''Return difference, science and template PNG bytes for candid, None unless all are cached'''
+        pngs = [self.get(candid, stamp, mode=mode) for stamp in STAMP_KEYS]
+        if (any(png is None for png in pngs)):
+            return None
+        return pngs
+
+    def put_stamps(self, candid, pngs, mode='equalize'):
+        for stamp, png in zip(STAMP_KEYS, pngs):
+            self.put(candid, stamp, png, mode=mode)
+
+    def has_stamps(self, candid, mode='equalize'):
+        '''True if all stamps for candid are in memory, without counting a hit or miss'''
+        with self.lock:
+            return all(('{}'.format(candid), stamp, mode) in self.data for stamp in STAMP_KEYS)
+
+    def stats(self):
+        '''Return the hit/miss/eviction counters and current size'''
+        with self.lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'entries': len(self.data), 'nbytes': self.nbytes}
+
+    def clear(self):
+        '''Empty the memory tier and reset the counters'''
+        with self.lock:
+            self.data.clear()
+            self.nbytes = 0
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+#cache shared by every light curve, use set_png_cache to change size or add a disk directory
+png_cache = PNGCache()
+
+def set_png_cache(cache):
+    '''Replace the PNGCache shared by fetch_png and the CutoutStores created afterwards,
+    e.g. set_png_cache(PNGCache(directory=...))'''
+    global png_cache
+    png_cache = cache
+    return cache
+
+#process pools shared by every light curve, keyed by the number of workers
+process_pools = {}
+process_pools_lock = threading.Lock()
+
+def process_pool(workers):
+    '''Return the shared pool of workers processes for cutout decoding.
+    The first call starts the processes, so make it from the kernel thread
+    before the pool is used from other threads'''
+    with process_pools_lock:
+        if (workers not in process_pools):
+            pool = ProcessPoolExecutor(max_workers=workers)
+            #with fork every process is started by the first task, not later from a fetch thread
+            pool.submit(int).result()
+            process_pools[workers] = pool
+        return process_pools[workers]
+
+def fetch_png(bucket, keys, cache=None, mode='equalize', executor=None):
+    '''Get and decode the cutouts for keys, None for alerts without images.
+    Cutouts are read from and added to cache (png_cache by default). With an
+    executor the decoding of the whole batch runs as one task of that executor'''
+    if (cache is None):
+        cache = png_cache
+    pngs = [cache.get_stamps(key, mode=mode) for key in keys]
+    missing = [i for i, png in enumerate(pngs) if png is None]
+    if (len(missing) == 0):
+        return pngs
+    decoded, triplets = [], []
+    for i, result in zip(missing, fetch_results(bucket, [keys[i] for i in missing])):
+        try:
+            triplets.append(stamp_triplet(result))
+            decoded.append(i)
+        except Exception:
+            pass
+    if (executor is None):
+        converted = convert_stamps(triplets, mode=mode)
+    else:
+        #the stages inside the worker process are not recorded here
+        with timer.stage('convert_process_pool', count=len(triplets)):
+            converted = executor.submit(convert_stamps, triplets, mode=mode).result()
+    for i, triplet_pngs in zip(decoded, converted):
+        if (triplet_pngs is not None):
+            pngs[i] = triplet_pngs
+            cache.put_stamps(keys[i], triplet_pngs, mode=mode)
+    return pngs
+
+#columns read from the alerts table for each light curve
+ALERT_COLUMNS = "pid, objectId, jd, magpsf, sigmapsf, magnr, sigmagnr, \
+        isdiffpos, diffmaglim ,magzpsci, ra, decl, fid, classtar, rb, \
+        candid, programid"
+
+#placeholder of each supported DB-API paramstyle
+SQL_PLACEHOLDERS = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+
+def sql_placeholder(dbcon, paramstyle=None):
+    '''Return the DB-API parameter placeholder used by the connection's driver.
+    paramstyle overrides the style found from the connection: the dialect of a
+    SQLAlchemy connectable, or the longest prefix of the connection's module that
+    defines it, e.g. mysql.connector for mysql.connector.connection_cext.
+    Raise ValueError if no style is found or it is not qmark, format or pyformat'''
+    if (paramstyle is None):
+        paramstyle = getattr(getattr(dbcon, 'dialect', None), 'paramstyle', None)
+    if (paramstyle is None):
+        parts = type(dbcon).__module__.split('.')
+        for n in range(len(parts), 0, -1):
+            module = sys.modules.get('.'.join(parts[:n]))
+            if (hasattr(module, 'paramstyle')):
+                paramstyle = module.paramstyle
+                break
+    if (paramstyle is None):
+        raise ValueError("cannot find the paramstyle of {} connections, pass paramstyle='qmark', "
+                         "'format' or 'pyformat'".format(type(dbcon).__module__))
+    if (paramstyle not in SQL_PLACEHOLDERS):
+        raise ValueError("paramstyle {!r} is not supported, pass paramstyle='qmark', 'format' or "
+                         "'pyformat' if the driver also accepts one of them".format(paramstyle))
+    return SQL_PLACEHOLDERS[paramstyle]
+
+def read_alerts_many(objectIds, dbcon, chunksize=900, paramstyle=None):
+    '''Query the alerts for many objectIds using IN (...) queries of at most chunksize ids,
+    paramstyle overrides the one of the connection (see sql_placeholder)'''
+    objectIds = list(objectIds)
+    placeholder = sql_placeholder(dbcon, paramstyle)
+    frames = []
+    for start in range(0, len(objectIds), chunksize):
+        chunk = objectIds[start:start+chunksize]
+        with timer.stage('alerts_query_many') as stage:
+            frames.append(pd.read_sql_query("SELECT {} FROM alerts where objectId IN ({}) \
+            ORDER BY objectId, jd".format(ALERT_COLUMNS, ', '.join([placeholder]*len(chunk))),
+                                            con=dbcon, params=tuple(chunk)))
+            stage.count = len(frames[-1])
+            stage.nbytes = int(frames[-1].memory_usage().sum()) if timer.enabled else 0
+    if (len(frames) == 0):
+        return pd.DataFrame(columns=[c.strip() for c in ALERT_COLUMNS.split(',')])
+    return pd.concat(frames, ignore_index=True)
+
+class ZeropointTable():
+    '''Zeropoint table (pid, pabszp, pabszpunc) indexed by pid once for many lookups'''
+    def __init__(self, zp_table):
+        pid = np.asarray(zp_table['pid'], dtype=np.int64)
+        order = np.argsort(pid, kind='stable')
+        self.pid = pid[order]
+        self.pabszp = np.asarray(zp_table['pabszp'], dtype=np.float64)[order]
+        self.pabszpunc = np.asarray(zp_table['pabszpunc'], dtype=np.float64)[order]
+
+    def lookup(self, pid):
+        '''Return pabszp and pabszpunc for each pid, NaN where the pid is not in the table'''
+        pid = np.asarray(pid, dtype=np.int64)
+        if (len(self.pid) == 0):
+            return np.full(len(pid), np.nan), np.full(len(pid), np.nan)
+        if (len(pid) > 10000):
+            #searching sorted pids is about twice as fast for large frames
+            order = np.argsort(pid)
+            position = np.empty(len(pid), dtype=np.intp)
+            position[order] = np.searchsorted(self.pid, pid[order])
+        else:
+            position = np.searchsorted(self.pid, pid)
+        position = np.minimum(position, len(self.pid) - 1)
+        found = self.pid[position] == pid
+        return np.where(found, self.pabszp[position], np.nan), np.where(found, self.pabszpunc[position], np.nan)
+
+def dc_magnitudes(zeropoints, pid, isdiffpos, magnr, sigmagnr, magpsf, sigmapsf):
+    '''Return the DC flux and magnitude columns of apply_zeropoint for arrays of alerts,
+    computed with the zeropoint of each pid; rows without a zeropoint are NaN'''
+    magzpsci, magzpsciunc = zeropoints.lookup(pid)
+    sign = np.where(np.asarray(isdiffpos) == 't', 1., -1.)
+    magnr = np.asarray(magnr, dtype=np.float64)
+    magpsf = np.asarray(magpsf, dtype=np.float64)
+    ref_flux = 10**(0.4 * (magzpsci - magnr))
+    ref_sigflux = np.asarray(sigmagnr, dtype=np.float64) / 1.0857 * ref_flux
+    difference_flux = 10**(0.4 * (magzpsci - magpsf))
+    difference_sigflux = np.asarray(sigmapsf, dtype=np.float64) / 1.0857 * difference_flux
+    dc_flux = ref_flux + sign * difference_flux
+    dc_sigflux = np.sqrt(np.where(difference_sigflux > ref_sigflux,
+                                  difference_sigflux**2 - ref_sigflux**2,
+                                  difference_sigflux**2 + ref_sigflux**2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dc_mag = magzpsci - 2.5 * np.log10(dc_flux)
+        dc_sigmag = dc_sigflux / dc_flux * 1.0857
+    return {'pabszp': magzpsci, 'pabszpunc': magzpsciunc, 'dc_flux': dc_flux, 'dc_sigflux': dc_sigflux,
+            'dc_mag': dc_mag, 'dc_sigmag': dc_sigmag}
+
+#error column of each magnitude column
+MAGNITUDE_ERRORS = {'magpsf': 'sigmapsf', 'dc_mag': 'dc_sigmag'}
+
+def apply_zeropoints(data, zeropoints):
+    '''Return a copy of an alerts frame, of one or many objects, with the DC magnitude columns added'''
+    with timer.stage('zeropoints', count=len(data)):
+        columns = dc_magnitudes(zeropoints, data['pid'].values, data['isdiffpos'].values, data['magnr'].values,
+                                data['sigmagnr'].values, data['magpsf'].values, data['sigmapsf'].values)
+        return data.assign(**columns)
+
+def read_max_jd(objectIds, dbcon, chunksize=900, paramstyle=None):
+    '''Return {objectId: latest jd} from the alerts table, objects without alerts are left out'''
+    objectIds = list(objectIds)
+    placeholder = sql_placeholder(dbcon, paramstyle)
+    max_jd = {}
+    for start in range(0, len(objectIds), chunksize):
+        chunk = objectIds[start:start+chunksize]
+        rows = pd.read_sql_query("SELECT objectId, MAX(jd) AS jd FROM alerts where objectId IN ({}) \
+        GROUP BY objectId".format(', '.join([placeholder]*len(chunk))), con=dbcon, params=tuple(chunk))
+        max_jd.update(zip(rows.objectId, rows.jd))
+    return max_jd
+
+#record layout of the cached photometry, objectId is the file name
+PHOTOMETRY_DTYPE = np.dtype([('pid', 'i8'), ('jd', 'f8'), ('magpsf', 'f8'), ('sigmapsf', 'f8'),
+                             ('magnr', 'f8'), ('sigmagnr', 'f8'), ('isdiffpos', 'U1'), ('diffmaglim', 'f8'),
+                             ('magzpsci', 'f8'), ('ra', 'f8'), ('decl', 'f8'), ('fid', 'i8'),
+                             ('classtar', 'f8'), ('rb', 'f8'), ('candid', 'i8'), ('programid', 'i8')])
+
+class PhotometryCache():
+    '''On-disk cache of alert photometry, one .npy record array per objectId.
+
+    Files are spread over subdirectories named by the last two characters of the
+    objectId. With check=True the latest jd of each object is queried first and
+    objects with newer alerts are read again; check=False serves cached objects
+    without touching the database (static historical data)'''
+    def __init__(self, directory, check=True):
+        self.directory = directory
+        self.check = check
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, objectId):
+        return os.path.join(self.directory, objectId[-2:], '{}.npy'.format(objectId))
+
+    def read(self, objectId):
+        '''Return the cached records of objectId, None if not cached'''
+        try:
+            return np.load(self.path(objectId))
+        except (IOError, ValueError):
+            return None
+
+    def write(self, objectId, data):
+        '''Store the alerts of one object and return True. Objects that do not fit the record
+        layout, including NULLs in integer or text columns, are not cached and return False'''
+        try:
+            records = np.empty(len(data), dtype=PHOTOMETRY_DTYPE)
+            for name in PHOTOMETRY_DTYPE.names:
+                values = data[name].values
+                #NULL integers arrive as NaN and would be cast silently
+                if (PHOTOMETRY_DTYPE[name].kind in 'iU' and pd.isnull(values).any()):
+                    return False
+                records[name] = values
+        except (KeyError, TypeError, ValueError):
+            return False
+        path = self.path(objectId)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        #write to a temporary file so readers never see partial records
+        tmp = '{}.{}.tmp.npy'.format(path[:-4], threading.get_ident())
+        np.save(tmp, records)
+        os.replace(tmp, path)
+        return True
+
+    def frame(self, objectIds, records):
+        '''Return one DataFrame in the column order of the alerts query'''
+        lengths = [len(r) for r in records]
+        records = np.concatenate(records) if len(records) > 0 else np.empty(0, dtype=PHOTOMETRY_DTYPE)
+        data = pd.DataFrame(records)
+        data.insert(1, 'objectId', np.repeat(np.asarray(objectIds, dtype=object), lengths))
+        return data
+
+    def load_many(self, objectIds, dbcon, chunksize=900, paramstyle=None):
+        '''Return the alerts of many objects like read_alerts_many, reading only
+        missing or stale objects from the database'''
+        objectIds = list(objectIds)
+        cached = OrderedDict()
+        with timer.stage('photometry_cache', count=len(objectIds)) as stage:
+            for objectId in objectIds:
+                records = self.read(objectId)
+                if (records is not None):
+                    cached[objectId] = records
+            stage.nbytes = sum(records.nbytes for records in cached.values())
+        stale = []
+        if (self.check == True and len(cached) > 0):
+            max_jd = read_max_jd(list(cached.keys()), dbcon, chunksize=chunksize, paramstyle=paramstyle)
+            for objectId, records in cached.items():
+                if (len(records) == 0 or max_jd.get(objectId, records['jd'][-1]) > records['jd'][-1]):
+                    stale.append(objectId)
+        missing = [objectId for objectId in objectIds if objectId not in cached] + stale
+        with self.lock:
+            self.hits += len(cached) - len(stale)
+            self.misses += len(missing) - len(stale)
+            self.refreshes += len(stale)
+        #objects that cannot be cached are served from the query
+        uncached = {}
+        if (len(missing) > 0):
+            data = read_alerts_many(missing, dbcon, chunksize=chunksize, paramstyle=paramstyle)
+            for objectId, group in data.groupby('objectId', sort=False):
+                if (self.write(objectId, group)):
+                    cached[objectId] = self.read(objectId)
+                else:
+                    cached.pop(objectId, None)
+                    uncached[objectId] = group
+        found = [objectId for objectId in objectIds
+                 if objectId in uncached or cached.get(objectId) is not None]
+        if (len(uncached) == 0):
+            return self.frame(found, [cached[objectId] for objectId in found])
+        return pd.concat([uncached[objectId] if objectId in uncached else
+                          self.frame([objectId], [cached[objectId]]) for objectId in found], ignore_index=True)
+
+    def load(self, objectId, dbcon, paramstyle=None):
+        '''Return the alerts of one object like the query in ZTF_lightcurve'''
+        return self.load_many([objectId], dbcon, paramstyle=paramstyle)
+
+    def stats(self):
+        '''Return the hit/miss/refresh counters'''
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'refreshes': self.refreshes}
+
+#band names and ZTF filter ids, in plotting order
+FILTER_IDS = OrderedDict([('g', 1), ('r', 2), ('i', 3)])
+
+#record layout of LightcurveArray, dc_mag and dc_sigmag are added for objects with zeropoints
+LIGHTCURVE_DTYPE = np.dtype([('candid', 'i8'), ('jd', 'f8'), ('ra', 'f8'), ('decl', 'f8'), ('magpsf', 'f4'),
+                             ('sigmapsf', 'f4'), ('diffmaglim', 'f4'), ('magzpsci', 'f4'), ('fid', 'i1')])
+DC_DTYPE = [('dc_mag', 'f4'), ('dc_sigmag', 'f4')]
+
+def lightcurve_records(data, order, dtype=None):
+    '''Return the rows order of an alerts frame as LIGHTCURVE_DTYPE records'''
+    if (dtype is None):
+        dtype = np.dtype(LIGHTCURVE_DTYPE.descr + (DC_DTYPE if 'dc_mag' in data else []))
+    records = np.empty(len(order), dtype=dtype)
+    for name in dtype.names:
+        records[name] = data[name].values[order]
+    return records
+
+def band_offsets(fid):
+    '''Return the first row of every band of FILTER_IDS and the end of the last band for sorted fid'''
+    bounds = list(FILTER_IDS.values()) + [max(FILTER_IDS.values()) + 1]
+    return tuple(int(offset) for offset in np.searchsorted(fid, bounds))
+
+class LightcurveArray():
+    '''Photometry of one object in a single structured array, sorted by filter then jd.
+
+    offsets holds the first row of every band of FILTER_IDS followed by the end of
+    the last band, so band() and band_slice() select a band without copying. Columns
+    are float32 except times, positions and candids'''
+    __slots__ = ['objectId', 'records', 'offsets']
+
+    def __init__(self, objectId, records, offsets):
+        self.objectId = objectId
+        self.records = records
+        self.offsets = offsets
+
+    @classmethod
+    def from_frame(cls, data, objectId=None):
+        '''Build the light curve of one object from an alerts frame'''
+        if (objectId is None):
+            objectId = data['objectId'].iloc[0]
+        order = np.lexsort((data['jd'].values, data['fid'].values))
+        records = lightcurve_records(data, order)
+        return cls(objectId, records, band_offsets(records['fid']))
+
+    @classmethod
+    def from_many(cls, data):
+        '''Return {objectId: LightcurveArray} for an alerts frame of many objects,
+        in order of first appearance. All objects are views of one record array'''
+        codes, objectIds = pd.factorize(data['objectId'])
+        order = np.lexsort((data['jd'].values, data['fid'].values, codes))
+        records = lightcurve_records(data, order)
+        #(object, filter) sort key, filter ids are below 8
+        key = codes[order].astype(np.int64) * 8 + np.clip(records['fid'], 0, 7)
+        first = 8 * np.arange(len(objectIds))
+        starts = np.searchsorted(key, first)
+        ends = np.searchsorted(key, first + 8)
+        bounds = list(FILTER_IDS.values()) + [max(FILTER_IDS.values()) + 1]
+        offsets = np.searchsorted(key, first[:, None] + bounds) - starts[:, None]
+        lightcurves = OrderedDict()
+        for objectId, start, end, offset in zip(objectIds, starts, ends, offsets.tolist()):
+            lightcurves[objectId] = cls(objectId, records[start:end], tuple(offset))
+        return lightcurves
+
+    def append(self, data):
+        '''Return a new LightcurveArray with the alerts of frame data added, and the
+        position of each of its rows in the current rows followed by the new ones'''
+        records = np.concatenate([self.records, lightcurve_records(data, np.arange(len(data)),
+                                                                   self.records.dtype)])
+        order = np.lexsort((records['jd'], records['fid']))
+        records = records[order]
+        return LightcurveArray(self.objectId, records, band_offsets(records['fid'])), order
+
+    def last_jd(self):
+        '''Return the time of the latest alert, -inf without alerts'''
+        return self.records['jd'].max() if len(self.records) > 0 else -np.inf
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, name):
+        return name in self.records.dtype.names
+
+    def __getitem__(self, name):
+        '''Return a column as a view'''
+        if (name not in self.records.dtype.names):
+            raise KeyError(name)
+        return self.records[name]
+
+    def band_slice(self, filt):
+        '''Return the slice of the rows of band filt (a FILTER_IDS name)'''
+        i = list(FILTER_IDS.keys()).index(filt)
+        return slice(self.offsets[i], self.offsets[i+1])
+
+    def band(self, filt):
+        '''Return the records of band filt as a view'''
+        return self.records[self.band_slice(filt)]
+
+    @property
+    def nbytes(self):
+        return self.records.nbytes
+
+    def frame(self):
+        '''Return the records as a DataFrame'''
+        data = pd.DataFrame(self.records)
+        data.insert(0, 'objectId', self.objectId)
+        return data